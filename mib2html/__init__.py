@@ -71,9 +71,20 @@ mib structure
 """
 
 from xml.etree import ElementTree as et
+from itertools import chain
+import copy
+import threading
+from bisect import bisect_left
+
+import jinja2
 
 import jinja_filter
 from util import *
+from jinja_filter import prepare_filters, filter_cache_scope, fl_parse_scalar, is_known_access
+from output import minify_html, write_page
+from emit import prepare_emitters
+from resolver import ModuleIndex, default_index_file, smipath_directories
+from typeresolver import TypeResolver
 
 
 # functions
@@ -121,6 +132,35 @@ def build_index(dom):
 
     return result
 
+# (section, reference) paths scanned by build_reverse_index
+REFERENCE_PATHS = [
+        (u"notifications/notification", u"objects/object"),
+        (u"groups/group", u"members/member"),
+        (u"compliances/compliance", u"requires/*"),
+        ]
+
+def build_reverse_index(dom):
+    """build reverse reference index ("referenced by")
+
+    Each notification, group and compliance is visited once,
+    so the cost is linear in the number of references.
+
+    input:
+        dom: ElementTree
+    return:
+        dict
+            referred name: [ (referrer tag, referrer name), ... ]
+            referrers are listed in document order
+    """
+    result = {}
+    for section, references in REFERENCE_PATHS:
+        for referrer in dom.iterfind(section):
+            entry = (referrer.tag, referrer.get(u"name"))
+            for ref in referrer.iterfind(references):
+                result.setdefault(ref.get(u"name"), []).append(entry)
+
+    return result
+
 def build_mib_node_array(dom):
     """Build sorted array of oid nodes 
     input:
@@ -141,18 +181,60 @@ def build_mib_node_array(dom):
     return mib_array
 
 
-def build_tree_index(dom,root):
+def find_subtree(mib_array, oid):
+    """find range of subtree in mib_array by binary search
+
+    input:
+        mib_array: array built by build_mib_node_array
+        oid: oid of subtree root (tuple)
+    return:
+        (lo, hi): mib_array[lo:hi] is the subtree including its root
+    """
+    # a 1-tuple sorts before every (oid, node) with the same oid
+    lo = bisect_left(mib_array, (oid,))
+    # the first oid which is not a descendant
+    hi = bisect_left(mib_array, (oid[:-1] + (oid[-1] + 1,),), lo)
+    return (lo, hi)
+
+def find_enclosing_table(mib_array, oid):
+    """find the table containing oid of its row, column or instance
+
+    input:
+        mib_array: array built by build_mib_node_array
+        oid: oid (tuple)
+    return:
+        table Element or None
+    """
+    pos = bisect_left(mib_array, (oid,)) - 1
+    if pos < 0:
+        return None
+    table_oid, node = mib_array[pos]
+    if node.tag == u"table" and oid[:len(table_oid)] == table_oid and oid != table_oid:
+        return node
+    return None
+
+def iter_oid_nodes(mib_array):
+    """iterate all elements having oid in mib_array, including rows and columns of tables"""
+    for oid_t, node in mib_array:
+        yield node
+        for child in node.iterfind(".//*[@oid]"):
+            yield child
+
+def build_tree_index(dom,root,nodes=None):
     """build index for tree drawing
     input:
         dom: (ElementTree)
         root: root oid to calculate base level (string)
+        nodes: elements to draw (iterable). All nodes in dom if None.
     result:
         (rootlevel,treeindex) : (integer, dict)
         treeindex: (tuple) -> (integer)
     """
     rootlevel = oidlen(root) - 1
     ttree = {}
-    for node in dom.iterfind(".//*[@oid]"):
+    if nodes is None:
+        nodes = dom.iterfind(".//*[@oid]")
+    for node in nodes:
         oid = node.get("oid")
         toid = oid_str2tuple(oid)
         curlevel = len( toid )
@@ -166,6 +248,38 @@ def build_tree_index(dom,root):
     return (rootlevel, ttree)
 
 
+def build_anchor_set(dom, index, sections, section_nodes, table_nodes=None):
+    """names which have hyperlink target (l_<name>) in the document
+
+    input:
+        dom: mib (ElementTree)
+        index: mib index generated by build_index (dict)
+        sections: names of rendered sections (set)
+        section_nodes: nodes of detail sections (see prepare_context)
+        table_nodes: nodes of the main table if their rows are link targets
+                     (virtual scrolling). iterable of Element or None
+    return:
+        frozenset of names. only names in index are included.
+    """
+    names = []
+    for node in section_nodes[u"nodes"]:
+        # plain nodes have no heading in the details
+        if node.tag == u"scalar":
+            names.append(node.get(u"name"))
+        elif node.tag == u"table":
+            names.append(node.get(u"name"))
+            names.extend( n.get(u"name") for n in node.iterfind(u".//*[@oid]") )
+    for section in [ u"notifications", u"groups", u"compliances" ]:
+        names.extend( n.get(u"name") for n in section_nodes[section] )
+    if u"typedefs" in sections:
+        names.extend( n.get(u"name") for n in dom.iterfind(u"typedefs/typedef") )
+    if u"imports" in sections:
+        names.extend( n.get(u"name") for n in dom.iterfind(u"imports/import") )
+    if table_nodes is not None:
+        names.extend( n.get(u"name") for n in table_nodes )
+
+    return frozenset( name for name in names if name in index )
+
 def find_identity(dom,index):
     """find identity name
     return identity name
@@ -188,17 +302,109 @@ def find_identity(dom,index):
 
     return identityName
 
+def resolve_oid(name_or_oid, index):
+    """resolve oid string from node name or numerical oid
+
+    input:
+        name_or_oid: node name or oid (string) e.g. "ifTable", "1.3.6.1.2.1.2.2"
+        index: mib index generated by build_index (dict)
+    return:
+        oid (string)
+    exceptions:
+        InvalidMibError: unknown name
+    """
+    oid = name_or_oid.lstrip(u".")
+    if oid.replace(u".", u"").isdigit():
+        if not all( arc.isdigit() for arc in oid.split(u".") ):
+            raise InvalidMibError(u"invalid oid: {}".format(name_or_oid))
+        return oid
+
+    if name_or_oid not in index or index[name_or_oid][0] == u"0":
+        raise InvalidMibError(u"no such node: {}".format(name_or_oid))
+    return index[name_or_oid][0]
+
+def check_mib(dom):
+    """validate MIB without rendering (--check mode)
+
+    Only the index is built, and all problems are collected
+    instead of stopping at the first one.
+
+    input:
+        dom: mib (ElementTree)
+    return:
+        list of (check, name, message) in the order found
+          check: "identity"  : module identity is missing or undefined
+                 "reference" : notification object, group member or
+                               compliance requirement is not defined
+                 "syntax"    : scalar or column without valid syntax
+                 "access"    : scalar or column with unknown access value
+    """
+    problems = []
+    index = build_index(dom)
+
+    try:
+        find_identity(dom, index)
+    except InvalidMibError as e:
+        identity = dom.find(u"./module/identity")
+        name = identity.get(u"node", u"") if identity is not None else u""
+        problems.append( (u"identity", name, u"no valid module identity: {}".format(e)) )
+
+    # references to other modules are checked by smidump
+    module = dom.find(u"./module")
+    module_name = module.get(u"name") if module is not None else None
+    for section, references in REFERENCE_PATHS:
+        for referrer in dom.iterfind(section):
+            for ref in referrer.iterfind(references):
+                name = ref.get(u"name")
+                if name not in index and ref.get(u"module", module_name) == module_name:
+                    problems.append( (u"reference", referrer.get(u"name"),
+                        u"{} {} refers to undefined {}".format(referrer.tag, referrer.get(u"name"), name)) )
+
+    for node in dom.iterfind(u".//*[@oid]"):
+        if node.tag in (u"scalar", u"column"):
+            # e.g. install, reportonly (SPPI) or <unknown> emitted by smidump
+            access = node.findtext(u"access")
+            unknown_access = access is not None and not is_known_access(access)
+            if unknown_access:
+                problems.append( (u"access", node.get(u"name"), u"unknown access value: {}".format(access)) )
+            try:
+                fl_parse_scalar(node)
+            except InvalidMibError as e:
+                problems.append( (u"syntax", node.get(u"name"), unicode(e)) )
+            except KeyError:
+                # conversion of unknown access (reported above)
+                if not unknown_access:
+                    raise
+
+    return problems
+
 # prepare template
 
+# sections of the document
+SECTIONS = ( "tree", "nodes", "notifications", "groups", "compliances", "typedefs", "imports" )
+
+# columns of the main MIB tree table
+COLUMNS = ( "tree", "name", "oid", "access", "syntax", "description", "units", "defval" )
+DEFAULT_COLUMNS = ( "tree", "name", "oid", "access", "syntax", "description" )
+
+# (section, tags in mib_array, path in dom) of oid-bearing detail sections
+DETAIL_SECTIONS = [
+        (u"nodes", (u"node", u"scalar", u"table"), u"nodes/*"),
+        (u"notifications", (u"notification",), u"notifications/notification"),
+        (u"groups", (u"group",), u"groups/group"),
+        (u"compliances", (u"compliance",), u"compliances/compliance"),
+        ]
+
 '''
 filters/functions can use same context as template by decorating with contextfilter/contextfunction
 '''
 
-def prepare_context(mib, opts):
+def prepare_context(mib, opts, modules=()):
     """Build context dict for rendering
 
         mib : XML data read from MIB
         opts: commandline options (Namespace object generated by argparse)
+        modules: other MIBs (list of ElementTree) to resolve imported types
     """
 
     # build various indicies from mib(xml ElementTree)
@@ -208,7 +414,42 @@ def prepare_context(mib, opts):
     identity_name = find_identity(mib, mib_index)
     identity_oid  = mib_index[identity_name][0]
 
-    root_oid  = ".".join( [str(i) for i in mib_array[0][0] ]) if opts.fromTop else identity_oid
+    sections = frozenset(opts.sections)
+    columns = list(opts.columns)
+
+    subtree_oid = None
+    tree_nodes = None
+    default_root = identity_oid
+    if opts.subtree:
+        # narrow down everything drawn to the subtree
+        subtree_oid = resolve_oid(opts.subtree, mib_index)
+        lo, hi = find_subtree(mib_array, oid_str2tuple(subtree_oid))
+        if lo == hi:
+            # rows and columns are drawn as a part of their table
+            table = find_enclosing_table(mib_array, oid_str2tuple(subtree_oid))
+            if table is not None:
+                subtree_oid = table.get(u"oid")
+                lo, hi = find_subtree(mib_array, oid_str2tuple(subtree_oid))
+        if lo == hi:
+            raise InvalidMibError(u"no node in subtree {}".format(opts.subtree))
+        mib_array = mib_array[lo:hi]
+        tree_nodes = iter_oid_nodes(mib_array)
+
+        # identity oid is used as root only when it contains the subtree
+        if not (subtree_oid + u".").startswith(identity_oid + u"."):
+            default_root = subtree_oid
+
+    # nodes of detail sections. unselected sections are left empty.
+    section_nodes = {}
+    for section, tags, path in DETAIL_SECTIONS:
+        if section not in sections:
+            section_nodes[section] = []
+        elif subtree_oid is not None:
+            section_nodes[section] = [ n for t, n in mib_array if n.tag in tags ]
+        else:
+            section_nodes[section] = mib.findall(path)
+
+    root_oid  = ".".join( [str(i) for i in mib_array[0][0] ]) if opts.fromTop else default_root
     root_oidlist = root_oid.split(u".")
     
     # adjust root level
@@ -218,7 +459,22 @@ def prepare_context(mib, opts):
     root_oid = u".".join(root_oidlist)
     root_oid_prefix = u".".join(root_oidlist[:-1]) + u"."
 
-    oid_prefix_level, ttree = build_tree_index(mib, root_oid)
+    if u"tree" in sections and u"tree" in columns:
+        oid_prefix_level, ttree = build_tree_index(mib, root_oid, tree_nodes)
+    else:
+        # no tree drawing
+        oid_prefix_level, ttree = (oidlen(root_oid) - 1, {})
+
+    # rows of virtual main table are link targets (see mibvirtual.js)
+    table_nodes = None
+    if opts.virtualTable and u"tree" in sections:
+        table_nodes = iter_oid_nodes(mib_array)
+    anchors = build_anchor_set(mib, mib_index, sections, section_nodes, table_nodes)
+
+    if sections.intersection([ u"nodes", u"notifications", u"groups" ]):
+        used_by = build_reverse_index(mib)
+    else:
+        used_by = {}
 
 
     return {
@@ -227,13 +483,24 @@ def prepare_context(mib, opts):
             u"identity": identity_oid,       # string
             u"identity_name": identity_name, # string
             u"index": mib_index,     # string -> (string{oid}, Element{node} )
+            u"used_by": used_by,     # string -> [ (string{tag}, string{name}) ]
+            u"anchors": anchors,     # set of names having hyperlink target
+            u"type_resolver": TypeResolver([ mib ] + list(modules)),
             u"tree_index": ttree,
             u"oid_prefix_level": oid_prefix_level,
             u"mib_array": mib_array,
+            u"section_nodes": section_nodes, # string -> [ Element ] for detail sections
+            u"subtree": subtree_oid, # string or None
+            u"sections": sections,   # set of section names to render
+            u"columns": columns,     # list of column names of the main table
+            u"virtual": opts.virtualTable,   # main table is drawn by virtual scrolling
             u"root_oid_prefix": root_oid_prefix,
             u"root_oid_prefix_len": len(root_oid_prefix),
             }
 
+# output formats for --emit option
+EMIT_FORMATS = ( "html", "json", "index" )
+
 def build_argparser():
     """build parser for commandline argument.
 
@@ -249,19 +516,75 @@ def build_argparser():
             raise argparse.ArgumentTypeError( "{} is not a positive integer.".format(s))
         return v
 
+    def _nameList(choices):
+        """Accept comma-separated list of the choices"""
+
+        def parse(s):
+            names = tuple( n.strip() for n in s.split(",") if n.strip() )
+            unknown = [ n for n in names if n not in choices ]
+            if unknown:
+                raise argparse.ArgumentTypeError( "unknown name {} (choose from {})".format(", ".join(unknown), ", ".join(choices)))
+            return names
+        return parse
+
+    def _emitTarget(s):
+        """Accept FORMAT=PATH for output target"""
+
+        fmt, sep, path = s.partition("=")
+        if not sep or not path:
+            raise argparse.ArgumentTypeError( "{} is not in format=path form.".format(s))
+        if fmt not in EMIT_FORMATS:
+            raise argparse.ArgumentTypeError( "unknown format {} (choose from {})".format(fmt, ", ".join(EMIT_FORMATS)))
+        return (fmt, None if path == "-" else path)
+
     parser = argparse.ArgumentParser(description='Generate HTML document from MIB(SMIv2) definition')
 
-    parser.add_argument('mibxml', help='MIB file or XML file(converted by smidump)')
+    parser.add_argument('mibxml', nargs='+', help='MIB file or XML file(converted by smidump). More files are accepted by --check.')
     parser.add_argument('-k', dest="forceMibParse", help='continue conversion forcely even when MIB error is detected (smidump option)', action='store_true')
     parser.add_argument('-r', dest="fromTop", help='set top oid as oid abbreviation root. Default root is identity oid', action='store_true' );
     parser.add_argument('-D', dest="templateException", help='change behavior for undefined object in templates (For template debugging only)', choices=['normal', 'debug', 'strict' ])
     parser.add_argument('-s', metavar="root_level_offset", dest="rootShiftLevel", help='offset of root oid level (default: 0)', type=_positiveInt, default=0 );
+    parser.add_argument('-M', metavar="directory", dest="mibDirs", help='MIB directory to locate imported modules (in addition to SMIPATH). Can be repeated.', action='append', default=[])
+    parser.add_argument('--mib-index', metavar="file", dest="mibIndexFile", help='file to keep the index of MIB modules in MIB directories (default: {})'.format(default_index_file()))
+    parser.add_argument('--load', metavar="mib", dest="loadMibs", help='additional MIB or XML file to load. Can be repeated.', action='append', default=[])
+    parser.add_argument('--annotate', metavar="file", dest="annotate", help='translate numeric oids in the file (e.g. snmpwalk output) into name.index form instead of generating HTML. "-" is standard input.')
+    parser.add_argument('--check', dest="check", help='validate MIB files without rendering, and report problems as JSON lines to standard output', action='store_true')
+    parser.add_argument('-j', metavar="jobs", dest="jobs", help='number of processes for --check (0: number of CPUs, default: 1)', type=_positiveInt, default=1)
+    parser.add_argument('--subtree', metavar="oid|name", dest="subtree", help='render the subtree under the node only')
+    parser.add_argument('--sections', metavar="name,...", dest="sections", help='sections to render (default: all of {})'.format(",".join(SECTIONS)), type=_nameList(SECTIONS), default=SECTIONS)
+    parser.add_argument('--columns', metavar="name,...", dest="columns", help='columns of the main MIB tree table in order, chosen from {} (default: {})'.format(",".join(COLUMNS), ",".join(DEFAULT_COLUMNS)), type=_nameList(COLUMNS), default=DEFAULT_COLUMNS)
+    parser.add_argument('--virtual', dest="virtualTable", help='draw the main MIB tree table by virtual scrolling (for large MIBs)', action='store_true')
+    parser.add_argument('-o', metavar="output", dest="output", help='write HTML to the file instead of standard output')
+    parser.add_argument('-m', '--minify', dest="minify", help='trim whitespace of generated HTML', action='store_true')
+    parser.add_argument('-z', '--gzip', dest="gzip", help='also write gzip-compressed copy as <output>.gz for each output file', action='store_true')
+    parser.add_argument('--emit', metavar="format=path", dest="emit", help='write output of the format ({}) to the path. "-" is standard output. Can be repeated.'.format(", ".join(EMIT_FORMATS)), type=_emitTarget, action='append', default=[])
+    parser.add_argument('--stats', dest="showStats", help='print rendering statistics to standard error', action='store_true')
     return parser
 
+def parse_command_line(args=None):
+    """parse commandline arguments
+
+    MIB files can be given between options (e.g. a.mib -j 4 b.mib),
+    which argparse does not accept for a positional argument.
+
+    return:
+        (parser, options)
+    """
+    parser = build_argparser()
+    options, extra = parser.parse_known_args(args)
+    unknown = [ arg for arg in extra if arg.startswith("-") and arg != "-" ]
+    if unknown:
+        parser.error("unrecognized arguments: {}".format(" ".join(unknown)))
+    options.mibxml += extra
+    return (parser, options)
+
 
-def mib2xmlpipe( mibfile, force=False ):
+def mib2xmlpipe( mibfile, force=False, preload=() ):
     """Convert MIB file to XML and returns file handle
 
+        preload: MIB files to load in advance (smidump -p option)
+                 imported modules are looked up from these files first.
+
         Return None in case of conversion failure.
     """
     ENV_MIB2XML = "mib2xml"
@@ -275,6 +598,8 @@ def mib2xmlpipe( mibfile, force=False ):
     if force:
         command += "-k "
     command_line = shlex.split( command )
+    for path in preload:
+        command_line += [ "-p", path ]
     command_line.append(mibfile)
 
     try:
@@ -283,12 +608,13 @@ def mib2xmlpipe( mibfile, force=False ):
     except OSError:
         return None
 
-def callwithxml( filename, callback, force=False ):
+def callwithxml( filename, callback, force=False, module_index=None ):
     """Prepare XML file handle for parser.
         Just open the specified file when XML is directly given.
         Otherwise, try conversion from MIB to XML.
 
         callback function must take 1 argument, and accept file object and file name.
+        module_index: ModuleIndex to resolve imported modules of MIB (optional)
 
         return: return type of the callback function
         dependency: environment variable MIB2XMLTOOL override default 'smidump'.
@@ -298,7 +624,8 @@ def callwithxml( filename, callback, force=False ):
 
     if not filename.endswith( ".xml" ):
         # assume given file is MIB
-        mibp = mib2xmlpipe(filename, force)
+        preload = module_index.resolve_preloads(filename) if module_index is not None else ()
+        mibp = mib2xmlpipe(filename, force, preload)
         if mibp != None:
             try:
                 return callback( mibp.stdout )
@@ -307,6 +634,223 @@ def callwithxml( filename, callback, force=False ):
 
     return callback( filename )
 
+# default values of command line options (Namespace), built on first use
+_default_namespace = None
+
+def _default_values():
+    """default options shared by all calls. must not be modified."""
+    global _default_namespace
+    if _default_namespace is None:
+        _default_namespace = build_argparser().parse_args(["-"])
+    return _default_namespace
+
+def default_options():
+    """return options (Namespace) filled with default values of command line"""
+    return copy.deepcopy(_default_values())
+
+def _option_values(options):
+    """options given as dict or Namespace (or None) as dict"""
+    if options is None:
+        return {}
+    return options if isinstance(options, dict) else vars(options)
+
+def _merge_options(options):
+    """complement options given as dict or Namespace with default values"""
+    merged = default_options()
+    for key, value in _option_values(options).iteritems():
+        setattr(merged, key, value)
+    return merged
+
+# options of the command line selecting output targets (not accepted by Renderer.render)
+TARGET_OPTIONS = ( "output", "gzip", "emit" )
+
+class Renderer(object):
+    """Reusable renderer holding compiled templates, filters and emitters
+
+    Template compilation and filter registration are done once
+    in the constructor. A Renderer can be shared between threads:
+    per-render state lives in the context built for each MIB,
+    and the filter cache is bound to the rendering thread.
+
+    usage:
+        renderer = Renderer()
+        html = renderer.render("SOME-MIB.xml")
+        renderer.render(xml_bytes, {"fromTop": True}, out=fileobj)
+    """
+
+    def __init__(self, undefined="normal", minify=False, template_name="template.html", module_index=None):
+        """
+        input:
+            undefined: policy for undefined object in templates ("normal", "debug", "strict")
+            minify: trim whitespace of HTML output (boolean)
+            template_name: top level template
+            module_index: resolver.ModuleIndex to locate imported MIB modules (optional)
+
+        undefined and minify are defaults. templateException and minify
+        in the options of build_context()/render() override them.
+        """
+        self.module_index = module_index
+        self.undefined = undefined or "normal"
+        self.minify = minify
+        self.template_name = template_name
+        self._templates = {}    # (undefined, minify) -> Template
+        self._lock = threading.Lock()
+
+        # compile the default template and options in advance
+        self._template(self.undefined, self.minify)
+        _default_values()
+        self.emitters = prepare_emitters()
+        self.emitters["html"] = self._generate_html
+
+    def _template(self, undefined, minify):
+        """return top level template compiled for the settings
+
+        An Environment is created once for each combination of settings.
+        """
+        key = (undefined, minify)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                return template
+
+            undefinedPolicy = jinja2.Undefined
+            if undefined == "strict":
+                undefinedPolicy = jinja2.StrictUndefined
+            elif undefined == "debug":
+                undefinedPolicy = jinja2.DebugUndefined
+
+            env = jinja2.Environment(autoescape=True,
+                    loader=jinja2.PackageLoader(__name__, package_path=""),
+                    undefined=undefinedPolicy,
+                    trim_blocks=minify,
+                    lstrip_blocks=minify)
+            for name, func in prepare_filters().iteritems():
+                env.filters[ name ] = func
+
+            template = env.get_template(self.template_name)
+            self._templates[key] = template
+            return template
+
+    def _generate_html(self, context):
+        undefined, minify = context.get(u"render_settings", (self.undefined, self.minify))
+        page = self._template(undefined, minify).generate(**context)
+        return minify_html(page) if minify else chain(page, [u"\n"])
+
+    def load(self, mib, force=False):
+        """Read MIB and return ElementTree
+
+        input:
+            mib: one of
+                - file name of MIB or XML converted by smidump
+                - file object to read MIB or XML from
+                - MIB or XML content (str)
+                - ElementTree (returned as is)
+            force: continue conversion even when MIB error is detected
+        exceptions:
+            IOError
+            et.ParseError
+        """
+        if isinstance(mib, et.ElementTree):
+            return mib
+
+        if hasattr(mib, "read"):
+            mib = mib.read()
+        elif not _is_mib_content(mib):
+            return callwithxml(mib, read_mib_xml, force=force, module_index=self.module_index)
+
+        if isinstance(mib, unicode):
+            mib = mib.encode("utf-8")
+
+        if mib.lstrip().startswith("<"):
+            return et.ElementTree(et.fromstring(mib))
+
+        # MIB source: smidump requires a file
+        import os, tempfile
+        fd, filename = tempfile.mkstemp(suffix=".mib")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(mib)
+            return callwithxml(filename, read_mib_xml, force=force, module_index=self.module_index)
+        finally:
+            os.remove(filename)
+
+    def build_context(self, mib, options=None, modules=None):
+        """Build the model shared by all output formats. See prepare_context.
+
+        input:
+            mib: see load()
+            options: dict or Namespace of command line options.
+                     default values are used for missing options.
+            modules: other MIBs (see load()) to resolve imported types.
+                     MIBs listed in options.loadMibs are loaded if None.
+        exceptions:
+            IOError, et.ParseError, InvalidMibError
+        """
+        values = _option_values(options)
+        options = _merge_options(options)
+        if modules is None:
+            modules = options.loadMibs
+        modules = [ self.load(m, force=options.forceMibParse) for m in modules ]
+        context = prepare_context(self.load(mib, force=options.forceMibParse), options, modules)
+
+        # template settings given in options override the defaults of the renderer
+        undefined = values.get("templateException") or self.undefined
+        minify = values.get("minify")
+        context[u"render_settings"] = (undefined, self.minify if minify is None else minify)
+        return context
+
+    def generate(self, context, fmt="html"):
+        """return output of the format as iterable of unicode string"""
+        return self.emitters[fmt](context)
+
+    def write(self, context, targets, compress=False, cache=None):
+        """Write outputs for the context
+
+        input:
+            context: built by build_context
+            targets: list of (format, file name or file object)
+            compress: write gzip copy for each file (boolean)
+            cache: FilterCache to collect statistics (optional)
+        return:
+            list of (size, compressed_size). see output.write_page
+        """
+        sizes = []
+        with filter_cache_scope(cache):
+            for fmt, out in targets:
+                sizes.append( write_page(self.generate(context, fmt), out, compress=compress) )
+        return sizes
+
+    def render(self, mib, options=None, out=None, fmt="html"):
+        """Render a MIB
+
+        input:
+            mib: see load()
+            options: see build_context()
+            out: file name or file object (binary mode) to write to.
+            fmt: output format (see EMIT_FORMATS)
+        return:
+            rendered document (unicode) if out is None.
+            size of written output in bytes otherwise.
+        exceptions:
+            ValueError: options select output targets (see TARGET_OPTIONS).
+                        use out and fmt instead.
+        """
+        defaults = _default_values()
+        for key, value in _option_values(options).iteritems():
+            if key in TARGET_OPTIONS and value != getattr(defaults, key):
+                raise ValueError("option {} is not accepted by render(). use out and fmt.".format(key))
+
+        context = self.build_context(mib, options)
+        if out is None:
+            with filter_cache_scope():
+                return u"".join(self.generate(context, fmt))
+
+        return self.write(context, [ (fmt, out) ])[0][0]
+
+def _is_mib_content(mib):
+    """distinguish MIB/XML content from file name"""
+    return "\n" in mib or mib.lstrip().startswith("<")
+
 def isEtree13Installed():
     "Check if proper version of ElementTree library is installed"
 
@@ -317,14 +861,115 @@ def isEtree13Installed():
 
     return True
 
+def annotate_main(options, mibs):
+    """annotate numeric oids in a file (--annotate mode)
+
+        options: commandline options (Namespace object generated by argparse)
+        mibs: list of ElementTree
+    """
+    import io
+    import sys
+    from annotate import OidAnnotator
+
+    annotator = OidAnnotator(mibs)
+    try:
+        if options.annotate == "-":
+            infile = io.open(sys.stdin.fileno(), encoding="utf-8", errors="replace", closefd=False)
+        else:
+            infile = io.open(options.annotate, encoding="utf-8", errors="replace")
+    except IOError:
+        print >> sys.stderr, "Failed to open file: {}".format(options.annotate)
+        return 1
+
+    try:
+        with infile:
+            size, compressed_size = write_page(annotator.annotate(infile), options.output, compress=options.gzip)
+    except IOError as e:
+        print >> sys.stderr, "Failed to write output: {}".format(e)
+        return 6
+
+    if options.showStats:
+        print >> sys.stderr, "annotate: {} lines, {} oids translated".format(annotator.lines, annotator.translated)
+    return 0
+
+# state of --check worker process (see _check_init)
+_check_state = {}
+
+def _check_init(force, mib_dirs, index_file):
+    """initialize --check worker"""
+    _check_state[u"force"] = force
+    _check_state[u"module_index"] = ModuleIndex(mib_dirs, index_file) if mib_dirs else None
+
+def _check_file(filename):
+    """validate a file in --check worker
+
+    return:
+        (filename, [ (check, name, message) ])
+        failures to read the file are reported as "open" or "parse" check,
+        and unexpected errors as "error" check, so that other files are checked
+    """
+    try:
+        mib = callwithxml(filename, read_mib_xml, force=_check_state[u"force"],
+                module_index=_check_state[u"module_index"])
+        return (filename, check_mib(mib))
+    except IOError as e:
+        return (filename, [ (u"open", u"", unicode(e)) ])
+    except et.ParseError as e:
+        return (filename, [ (u"parse", u"", unicode(e)) ])
+    except Exception as e:
+        return (filename, [ (u"error", u"", u"{}: {}".format(type(e).__name__, e)) ])
+
+def check_main(options, module_index=None):
+    """validate MIB files (--check mode)
+
+    Each problem is written to standard output as a line of JSON object
+    with "file", "check", "name" and "message" keys.
+    Files are checked in parallel when options.jobs is not 1.
+
+        options: commandline options (Namespace object generated by argparse)
+        module_index: ModuleIndex to resolve imported modules (optional)
+    return:
+        0 if no problem is found, 5 otherwise
+    """
+    import json
+    import multiprocessing
+    import sys
+
+    filenames = list(options.mibxml)
+    init_args = (options.forceMibParse,
+            module_index.directories if module_index is not None else [],
+            module_index.index_file if module_index is not None else None)
+
+    jobs = options.jobs or multiprocessing.cpu_count()
+    pool = None
+    if jobs > 1 and len(filenames) > 1:
+        pool = multiprocessing.Pool(min(jobs, len(filenames)), _check_init, init_args)
+        results = pool.imap(_check_file, filenames)
+    else:
+        _check_init(*init_args)
+        results = ( _check_file(f) for f in filenames )
+
+    count = 0
+    try:
+        for filename, problems in results:
+            for check, name, message in problems:
+                print json.dumps({ u"file": filename, u"check": check, u"name": name, u"message": message }, sort_keys=True)
+                count += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if options.showStats:
+        print >> sys.stderr, "check: {} files, {} problems".format(len(filenames), count)
+    return 5 if count else 0
+
 def main():
 
     import sys
     import textwrap
-    import jinja2
 
-    # import submodule
-    from jinja_filter import prepare_filters
+    from jinja_filter import FilterCache
 
     if not isEtree13Installed():
         print >> sys.stderr, textwrap.dedent( """\
@@ -336,61 +981,99 @@ def main():
         return 31
 
 
-    parser = build_argparser()
-    options = parser.parse_args()
+    parser, options = parse_command_line()
 
     # We don't have to take error cases into account
     # because parse_args aborts program execution with error messages.
     # when given command line options are inappropriate
-
-    filename = options.mibxml
-
-    try:
-        mib = callwithxml( filename, read_mib_xml, force=options.forceMibParse)
-        # mib = read_mib_xml(filename)
-    except (IOError):
-        print >> sys.stderr, "Failed to open XML file: {}".format(filename)
-        return 1
-
-    except et.ParseError as e:
-        print >> sys.stderr, textwrap.dedent( """\
-        Parse Error : {}
-        This tool accept MIB file or xml-formatted MIB file translated from MIB(SMI) file.
-
-        Confirm if smidump command is in the search path
-        or explicitly specified by "mib2xml" environment variable
-        if you specified MIB file.
-
-        Confirm if specified file is valid XML format
-        compatible with smidump output
-        if you specified xml file.
-
-        smidump command is available as a part of libsmi
-        http://www.ibr.cs.tu-bs.de/projects/libsmi/
-        """ ).format(e.message)
-        return 3
+    targets = list(options.emit)
+    if options.output is not None or not targets:
+        targets.insert(0, ("html", options.output))
+
+    if options.gzip and any( path is None for fmt, path in targets ):
+        parser.error("-z requires output files (-o or --emit format=path)")
+
+    if len(options.mibxml) > 1 and not options.check:
+        parser.error("only one MIB file can be rendered (more files are accepted by --check)")
+
+    # index of modules in MIB directories to resolve imports without search
+    module_index = None
+    mib_dirs = options.mibDirs + smipath_directories()
+    if mib_dirs:
+        module_index = ModuleIndex(mib_dirs, options.mibIndexFile or default_index_file())
+
+    if options.check:
+        if module_index is not None:
+            # workers read the saved index
+            module_index.refresh()
+            try:
+                module_index.save()
+            except (IOError, OSError) as e:
+                print >> sys.stderr, "Warning: failed to save MIB module index: {}".format(e)
+        return check_main(options, module_index)
+
+    renderer = Renderer(undefined=options.templateException, minify=options.minify, module_index=module_index)
+
+    mibs = []
+    for filename in options.mibxml[:1] + options.loadMibs:
+        try:
+            mibs.append( renderer.load(filename, force=options.forceMibParse) )
+        except (IOError):
+            print >> sys.stderr, "Failed to open XML file: {}".format(filename)
+            return 1
+
+        except et.ParseError as e:
+            print >> sys.stderr, textwrap.dedent( """\
+            Parse Error : {}
+            This tool accept MIB file or xml-formatted MIB file translated from MIB(SMI) file.
+
+            Confirm if smidump command is in the search path
+            or explicitly specified by "mib2xml" environment variable
+            if you specified MIB file.
+
+            Confirm if specified file is valid XML format
+            compatible with smidump output
+            if you specified xml file.
+
+            smidump command is available as a part of libsmi
+            http://www.ibr.cs.tu-bs.de/projects/libsmi/
+            """ ).format(e.message)
+            return 3
+
+    if module_index is not None:
+        try:
+            module_index.save()
+        except (IOError, OSError) as e:
+            print >> sys.stderr, "Warning: failed to save MIB module index: {}".format(e)
+
+    mib = mibs[0]
+    if options.annotate is not None:
+        return annotate_main(options, mibs)
 
     try:
-        # prepare
-        undefinedPolicy = jinja2.Undefined
-        if options.templateException == "strict":
-            undefinedPolicy = jinja2.StrictUndefined
-        elif options.templateException == "debug":
-            undefinedPolicy = jinja2.DebugUndefined
-
-        template_env = jinja2.Environment(autoescape=True,
-                loader=jinja2.PackageLoader(__name__, package_path=""),
-                undefined=undefinedPolicy)
-        for key, func in prepare_filters().iteritems():
-            template_env.filters[ key ] = func
-
-        template = template_env.get_template("template.html")
-        print template.render(**(prepare_context(mib, options)) )
+        # build the model once and feed every target from it
+        context = renderer.build_context(mib, options, mibs[1:])
+        cache = FilterCache()
+        sizes = renderer.write(context, targets, compress=options.gzip, cache=cache)
+
+        if options.showStats:
+            if module_index is not None:
+                print >> sys.stderr, "module index: {} files read".format(module_index.scanned)
+            print >> sys.stderr, "filter cache: {hits} hits, {misses} misses".format(**cache.stats())
+            print >> sys.stderr, "type resolver: {} types resolved".format(context[u"type_resolver"].resolved)
+            for (fmt, path), (size, compressed_size) in zip(targets, sizes):
+                print >> sys.stderr, "output {} ({}): {} bytes".format(path or "-", fmt, size)
+                if compressed_size is not None:
+                    print >> sys.stderr, "compressed output {}.gz: {} bytes".format(path, compressed_size)
 
     except InvalidMibError as e :
         print >> sys.stderr, "MIB XML is invalid: {}".format(e.message)
         return 5
 
+    except IOError as e:
+        print >> sys.stderr, "Failed to write output: {}".format(e)
+        return 6
+
     return 0
     
 if __name__ == '__main__':
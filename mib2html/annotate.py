@@ -0,0 +1,302 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Annotation of numeric oids (e.g. snmpwalk output) with MIB object names
+"""
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013, Gentaro Muramatsu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import re
+
+from util import *
+
+# numeric oid in text: at least 2 sub-identifiers, optionally with leading dot
+_re_numeric_oid = re.compile(r"(?<![\w.])\.?([0-2](?:\.\d+)+)(?![\w.])")
+
+# kinds of index sub-identifier encoding (RFC 2578 7.7)
+INDEX_INT = u"int"       # one sub-identifier
+INDEX_STRING = u"str"    # length followed by octets (or rest if IMPLIED)
+INDEX_OID = u"oid"       # length followed by sub-identifiers (or rest if IMPLIED)
+INDEX_IPADDRESS = u"ip"  # 4 sub-identifiers
+# an integer kind means fixed-length string of the length
+
+# index kinds of well-known types which are defined outside of given MIBs
+KNOWN_INDEX_TYPES = {
+        u"INTEGER": INDEX_INT,
+        u"Integer32": INDEX_INT,
+        u"Unsigned32": INDEX_INT,
+        u"Gauge32": INDEX_INT,
+        u"Counter32": INDEX_INT,
+        u"TimeTicks": INDEX_INT,
+        u"TimeStamp": INDEX_INT,
+        u"TimeInterval": INDEX_INT,
+        u"TruthValue": INDEX_INT,
+        u"RowStatus": INDEX_INT,
+        u"StorageType": INDEX_INT,
+        u"InterfaceIndex": INDEX_INT,
+        u"InterfaceIndexOrZero": INDEX_INT,
+        u"InetAddressType": INDEX_INT,
+        u"InetPortNumber": INDEX_INT,
+        u"IpAddress": INDEX_IPADDRESS,
+        u"MacAddress": 6,
+        u"OctetString": INDEX_STRING,
+        u"OCTET STRING": INDEX_STRING,
+        u"DisplayString": INDEX_STRING,
+        u"SnmpAdminString": INDEX_STRING,
+        u"PhysAddress": INDEX_STRING,
+        u"InetAddress": INDEX_STRING,
+        u"ObjectIdentifier": INDEX_OID,
+        u"OBJECT IDENTIFIER": INDEX_OID,
+        u"AutonomousType": INDEX_OID,
+        u"RowPointer": INDEX_OID,
+        }
+
+# index kinds of smidump basetype attribute
+_basetype_kinds = {
+        u"OctetString": INDEX_STRING,
+        u"Bits": INDEX_STRING,
+        u"ObjectIdentifier": INDEX_OID,
+        }
+
+class OidAnnotator(object):
+    """Translate numeric oids into name.index form
+
+    The oid of every named element is kept in a dict,
+    and the longest known prefix is found by removing
+    sub-identifiers from the end (at most one probe per level).
+    The rest of the oid of a column is split into index components
+    according to the INDEX clause of its row.
+
+    usage:
+        annotator = OidAnnotator([ mib1, mib2 ])
+        annotator.translate(u"1.3.6.1.2.1.2.2.1.2.3")  # -> u"ifDescr.3"
+        for line in annotator.annotate(lines):
+            ...
+    """
+
+    # translations kept per distinct oid. cleared when exceeded.
+    memo_limit = 100000
+
+    def __init__(self, mibs):
+        """
+        input:
+            mibs: list of ElementTree
+                  the first definition is used when a name or oid is defined twice.
+        """
+        self._nodes = {}     # oid -> (name, Element, row Element of column or None)
+        self._names = {}     # name -> Element
+        self._typedefs = {}  # name -> typedef Element
+        self._index_specs = {}  # id(row) -> [ (kind, implied) ]
+        self._memo = {}
+        self.lines = 0
+        self.translated = 0
+
+        for mib in mibs:
+            self._add_mib(mib)
+
+    def _add_mib(self, mib):
+        # elements are walked directly because build_index is keyed by name
+        column_rows = {}
+        for row in mib.iterfind(u"nodes/table/row"):
+            for column in row.iterfind(u"column"):
+                column_rows[column] = row
+
+        for node in mib.iterfind(u".//*[@oid]"):
+            name = node.get(u"name")
+            self._names.setdefault(name, node)
+            self._nodes.setdefault(node.get(u"oid"), (name, node, column_rows.get(node)))
+
+        for node in mib.iterfind(u"typedefs/typedef"):
+            self._typedefs.setdefault(node.get(u"name"), node)
+
+    def lookup(self, oid):
+        """find the longest known prefix of oid
+
+        input:
+            oid: numeric oid without leading dot (string)
+        return:
+            ((name, Element, row), suffix) or (None, oid)
+            suffix is the rest of oid without leading dot
+        """
+        nodes = self._nodes
+        prefix = oid
+        while True:
+            entry = nodes.get(prefix)
+            if entry is not None:
+                return (entry, oid[len(prefix) + 1:])
+            pos = prefix.rfind(u".")
+            if pos < 0:
+                return (None, oid)
+            prefix = prefix[:pos]
+
+    def index_kind(self, column):
+        """return index kind of a column (INDEX_INT etc.) or None if unknown"""
+        syntax = column.find(u"syntax/*")
+        if syntax is None:
+            return None
+
+        if syntax.tag == u"type":
+            name = syntax.get(u"name")
+            typedef = self._typedefs.get(name)
+            if typedef is None:
+                return KNOWN_INDEX_TYPES.get(name)
+            syntax = typedef
+
+        kind = _basetype_kinds.get(syntax.get(u"basetype"), INDEX_INT)
+        parent = syntax.find(u"parent")
+        if parent is not None and parent.get(u"name") in KNOWN_INDEX_TYPES:
+            kind = KNOWN_INDEX_TYPES[parent.get(u"name")]
+
+        if kind == INDEX_STRING:
+            # fixed-length string has no length sub-identifier
+            ranges = syntax.findall(u"range")
+            if len(ranges) == 1 and ranges[0].get(u"min") == ranges[0].get(u"max"):
+                return int(ranges[0].get(u"min"))
+        return kind
+
+    def index_spec(self, row):
+        """return [ (kind, implied), ... ] for INDEX clause of a row"""
+        spec = self._index_specs.get(id(row))
+        if spec is None:
+            augments = row.find(u"linkage/augments")
+            if augments is not None and augments.get(u"name") in self._names:
+                spec = self.index_spec(self._names[augments.get(u"name")])
+            else:
+                spec = []
+                for index in row.iterfind(u"linkage/index"):
+                    column = self._names.get(index.get(u"name"))
+                    kind = self.index_kind(column) if column is not None else None
+                    spec.append( (kind, index.get(u"implied") == u"true") )
+            self._index_specs[id(row)] = spec
+        return spec
+
+    def split_index(self, suffix, spec):
+        """split instance suffix into index components
+
+        Sub-identifiers which cannot be decoded are kept as one component.
+
+        input:
+            suffix: sub-identifiers after column oid (string)
+            spec: see index_spec
+        return:
+            list of string
+        """
+        arcs = suffix.split(u".")
+        parts = []
+        pos = 0
+        for kind, implied in spec:
+            if pos >= len(arcs) or kind is None:
+                break
+
+            if kind == INDEX_INT:
+                parts.append(arcs[pos])
+                pos += 1
+                continue
+
+            start = pos
+            if kind == INDEX_IPADDRESS:
+                length = 4
+            elif isinstance(kind, int):
+                length = kind
+            elif implied:
+                length = len(arcs) - pos
+            else:
+                length = int(arcs[pos])
+                start = pos + 1
+
+            value = arcs[start:start + length]
+            if len(value) < length:
+                # malformed instance: keep the rest as is
+                break
+            pos = start + length
+
+            if kind in (INDEX_OID, INDEX_IPADDRESS):
+                parts.append(u".".join(value))
+            else:
+                parts.append(_format_octets(value))
+
+        if pos < len(arcs):
+            parts.append(u".".join(arcs[pos:]))
+        return parts
+
+    def translate(self, oid):
+        """translate numeric oid into name.index form
+
+        input:
+            oid: numeric oid without leading dot (string)
+        return:
+            translated string or None if no prefix is known
+        """
+        result = self._memo.get(oid)
+        if result is not None:
+            return result
+
+        (entry, suffix) = self.lookup(oid)
+        if entry is None:
+            return None
+
+        name, node, row = entry
+        if not suffix:
+            result = name
+        elif row is not None:
+            result = u".".join( [ name ] + self.split_index(suffix, self.index_spec(row)) )
+        else:
+            result = name + u"." + suffix
+
+        if len(self._memo) >= self.memo_limit:
+            self._memo.clear()
+        self._memo[oid] = result
+        return result
+
+    def _replace(self, match):
+        result = self.translate(match.group(1))
+        if result is None:
+            return match.group(0)
+        self.translated += 1
+        return result
+
+    def annotate(self, lines):
+        """translate numeric oids in each line
+
+        input:
+            lines: iterable of unicode string
+        return:
+            generator of unicode string
+        """
+        sub = _re_numeric_oid.sub
+        replace = self._replace
+        for line in lines:
+            self.lines += 1
+            yield sub(replace, line)
+
+def _format_octets(arcs):
+    """quoted string for printable octets, hexadecimal (0x...) otherwise"""
+    values = [ int(a) for a in arcs ]
+    if all( 32 <= v < 127 and v != 34 for v in values ):
+        return u'"' + u"".join( map(unichr, values) ) + u'"'
+    if all( v < 256 for v in values ):
+        return u"0x" + u"".join( u"{:02x}".format(v) for v in values )
+    return u".".join(arcs)
@@ -0,0 +1,214 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Emitters of machine-readable output built from the rendering context
+"""
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013, Gentaro Muramatsu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import json
+
+from jinja_filter import fl_format_syntax, fl_parse_scalar, fl_parse_typedef
+from util import *
+
+_encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
+# model records
+
+def _name_list(node, path):
+    return [ child.get(u"name") for child in node.iterfind(path) ]
+
+def node_record(node, rowcreate=False):
+    """Build dict for an Element which has oid attribute
+
+    input:
+        node: (Element) node, scalar, table, row, column,
+              notification, group or compliance
+        rowcreate: True for columns of creatable rows
+    return:
+        dict
+    """
+    record = {
+            u"name": node.get(u"name"),
+            u"oid": node.get(u"oid"),
+            u"kind": node.tag,
+            u"status": node.get(u"status", u"current"),
+            }
+
+    if node.tag in (u"scalar", u"column"):
+        record[u"syntax"] = fl_format_syntax(node)
+        fields = dict(fl_parse_scalar(node, rowcreate))
+        for key in [ u"max-access", u"units", u"default", u"format", u"reference" ]:
+            if key in fields:
+                record[key] = fields[key]
+
+    elif node.tag == u"row":
+        record[u"index"] = _name_list(node, u"linkage/index")
+        augments = node.find(u"linkage/augments")
+        if augments is not None:
+            record[u"augments"] = augments.get(u"name")
+        record[u"create"] = node.get(u"create") == u"true"
+
+    elif node.tag == u"notification":
+        record[u"objects"] = _name_list(node, u"objects/object")
+    elif node.tag == u"group":
+        record[u"objects"] = _name_list(node, u"members/member")
+    elif node.tag == u"compliance":
+        record[u"objects"] = _name_list(node, u"requires/*")
+
+    description = node.findtext(u"description")
+    if description is not None:
+        record[u"description"] = description.strip()
+
+    return record
+
+def iter_node_records(mib_array):
+    """Generate records in the order of the main MIB tree table
+
+    rows and columns follow their table.
+
+    input:
+        mib_array: array built by build_mib_node_array
+    """
+    for oid_t, node in mib_array:
+        yield node_record(node)
+        if node.tag == u"table":
+            row = node.find(u"row")
+            if row is None:
+                continue
+            yield node_record(row)
+            create = row.get(u"create", u"").lower() == u"true"
+            for column in row.iterfind(u"column"):
+                yield node_record(column, rowcreate=create)
+
+def typedef_record(node):
+    """Build dict for a typedef Element"""
+    record = {
+            u"name": node.get(u"name"),
+            u"basetype": node.get(u"basetype"),
+            }
+    parent = node.find(u"parent")
+    if parent is not None:
+        record[u"parent"] = parent.get(u"name")
+
+    # the first field is the short-form of the type (see fl_parse_typedef)
+    fields = fl_parse_typedef(node)
+    record[u"syntax"] = fields[0][1]
+    for key, value in fields[1:]:
+        record[key] = value.strip() if key == u"description" else value
+
+    return record
+
+# emitters
+#
+# An emitter takes the context built by prepare_context and returns
+# an iterable of unicode string.
+
+def _stream_array(records):
+    """encode iterable of records as JSON array chunk by chunk"""
+    yield u"["
+    separator = u"\n"
+    for record in records:
+        yield separator
+        yield _encoder.encode(record)
+        separator = u",\n"
+    yield u"\n]"
+
+def _stream_object(members):
+    """encode JSON object from (key, chunks) pairs"""
+    yield u"{"
+    separator = u"\n"
+    for key, chunks in members:
+        yield separator
+        yield _encoder.encode(key)
+        yield u": "
+        for chunk in chunks:
+            yield chunk
+        separator = u",\n"
+    yield u"\n}\n"
+
+def generate_json(context):
+    """Emit whole model as JSON
+
+    Each record is encoded separately, so that the document is never held in memory.
+    """
+    mib = context[u"mib"]
+
+    def value(v):
+        return [ _encoder.encode(v) ]
+
+    return _stream_object([
+        (u"module", value(mib.find(u"module").get(u"name"))),
+        (u"identity", value(context[u"identity_name"])),
+        (u"identity_oid", value(context[u"identity"])),
+        (u"nodes", _stream_array(iter_node_records(context[u"mib_array"]))),
+        (u"typedefs", _stream_array(
+            typedef_record(node) for node in mib.iterfind(u"typedefs/typedef"))),
+        (u"imports", _stream_array(
+            { u"name": node.get(u"name"), u"module": node.get(u"module") }
+            for node in mib.iterfind(u"imports/import"))),
+        ])
+
+def _summary(description, length=120):
+    """first line of description, truncated"""
+    if description is None:
+        return u""
+    text = u" ".join(description.split())
+    return text if len(text) <= length else text[:length - 3] + u"..."
+
+def generate_search_index(context):
+    """Emit search index as JSON
+
+    entries are sorted by name and consist of
+    [ name, oid, kind, anchor, summary ].
+    anchor is the hyperlink target in HTML output.
+    Names not rendered in HTML with the same options are not listed.
+    """
+    mib = context[u"mib"]
+    anchors = context[u"anchors"]
+    entries = []
+    for name, (oid, node) in context[u"index"].iteritems():
+        if node.tag == u"import" or name not in anchors:
+            continue
+        entries.append( [ name, oid if oid != u"0" else u"", node.tag, u"l_" + name,
+            _summary(node.findtext(u"description")) ] )
+    entries.sort()
+
+    return _stream_object([
+        (u"module", [ _encoder.encode(mib.find(u"module").get(u"name")) ]),
+        (u"fields", [ _encoder.encode([ u"name", u"oid", u"kind", u"anchor", u"summary" ]) ]),
+        (u"entries", _stream_array(entries)),
+        ])
+
+def prepare_emitters():
+    """return dict of format name -> emitter
+
+    "html" is provided by the caller because it needs a template.
+    """
+    return {
+            u"json": generate_json,
+            u"index": generate_search_index,
+            }
@@ -32,10 +32,16 @@ THE SOFTWARE.
 import jinja2
 from jinja2.utils import Markup
 
+import inspect
+import json
 import re
+import threading
+from contextlib import contextmanager
+from functools import wraps
 from itertools import count, izip
 
 from util import *
+from typeresolver import format_base_type
 
 def prepare_filters():
     return {
@@ -49,12 +55,134 @@ def prepare_filters():
             u"parse_table":     fl_parse_table,
             u"parse_table_toc": fl_parse_table_toc,
             u"parse_row":       fl_parse_row,
+            u"resolve_syntax":  fl_resolve_syntax,
+            u"format_base_type":  fl_format_base_type,
+            u"format_type_chain": fl_format_type_chain,
+            u"syntax_with_base":  fl_syntax_with_base,
+            u"virtual_rows":    fl_virtual_rows,
+            u"tree_styles":     fl_tree_styles,
             u"l":               fl_hyperlink,
             }
-            
+
+
+# per-render memoization for filters keyed by Element
+
+class FilterCache(object):
+    """Memo for filters whose result depends only on an Element and arguments
+
+    An Element is keyed by its identity.
+    The Element is stored together with the result
+    so that its id() cannot be reused while the entry is alive.
+
+    attributes:
+        hits, misses: statistics of lookups (integer)
+    """
+
+    def __init__(self):
+        self._memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, func, node, args, kwargs):
+        """return func(node, *args, **kwargs), computing it only once
+
+        The key is built from bound arguments, so that positional and keyword
+        calls, or calls with and without default values, share the entry.
+        """
+        key = (func.__name__, id(node), _bound_arguments(func, args, kwargs))
+        entry = self._memo.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = func(node, *args, **kwargs)
+        self._memo[key] = (node, value)
+        return value
+
+    def clear(self):
+        """drop memoized results. statistics are kept."""
+        self._memo.clear()
+
+    def stats(self):
+        """return statistics as dict"""
+        return {
+                u"hits": self.hits,
+                u"misses": self.misses,
+                u"entries": len(self._memo),
+                }
+
+# func -> (names of arguments after the node, { name: default value })
+_argspecs = {}
+
+def _bound_arguments(func, args, kwargs):
+    """arguments of func following the node as sorted (name, value) tuple
+
+    default values are filled for omitted arguments.
+    """
+    spec = _argspecs.get(func)
+    if spec is None:
+        argspec = inspect.getargspec(func)
+        names = argspec.args[1:]
+        defaults = argspec.defaults or ()
+        spec = (names, dict(zip(names[len(names) - len(defaults):], defaults)))
+        _argspecs[func] = spec
+
+    names, defaults = spec
+    if len(args) > len(names) or any( k not in names for k in kwargs ):
+        # raise TypeError as the call does
+        inspect.getcallargs(func, None, *args, **kwargs)
+    bound = dict(defaults)
+    bound.update(izip(names, args))
+    bound.update(kwargs)
+    return tuple(sorted(bound.iteritems()))
+
+_cache_scope = threading.local()
+
+def active_filter_cache():
+    """return FilterCache of the current render or None"""
+    return getattr(_cache_scope, "cache", None)
+
+@contextmanager
+def filter_cache_scope(cache=None):
+    """activate a FilterCache while rendering
+
+    The cache is bound to the current thread and cleared on exit.
+
+    usage:
+        with filter_cache_scope() as cache:
+            template.render(...)
+        print cache.stats()
+    """
+    if cache is None:
+        cache = FilterCache()
+
+    outer = active_filter_cache()
+    _cache_scope.cache = cache
+    try:
+        yield cache
+    finally:
+        _cache_scope.cache = outer
+        cache.clear()
+
+def memoized_filter(func):
+    """decorator for filters taking an Element as the first argument
+
+    Results are shared within the active filter_cache_scope().
+    Without active scope, func is called as is.
+    """
+    @wraps(func)
+    def wrapper(node, *args, **kwargs):
+        cache = active_filter_cache()
+        if cache is None:
+            return func(node, *args, **kwargs)
+        return cache.call(func, node, args, kwargs)
+    return wrapper
+
 
 # jinja filter functions
 
+@memoized_filter
 def fl_format_syntax(node):
     """create string expression of syntax (mib data type)
     input:
@@ -79,6 +207,47 @@ def fl_format_syntax(node):
     else:
         raise InvalidMibError("syntax for {} has no type or typedef node".format(node.get("name")))
 
+@jinja2.contextfilter
+def fl_resolve_syntax(ctx, node):
+    """resolve textual convention chain of the syntax of node
+    input:
+        ctx: template context
+         - type_resolver
+        node: an Element which has "syntax" child element
+    return:
+        typeresolver.ResolvedType or None
+    """
+    return ctx.parent[u"type_resolver"].resolve_syntax(node)
+
+def fl_format_base_type(resolved):
+    """string expression of base type and constraints of ResolvedType
+    return:
+        string (empty for None)
+    """
+    if resolved is None:
+        return u""
+    return format_base_type(resolved)
+
+def fl_format_type_chain(resolved):
+    """string expression of textual convention chain of ResolvedType
+    example:
+        SampleShortName → SampleName → DisplayString
+    """
+    if resolved is None:
+        return u""
+    return u" \u2192 ".join(resolved.chain)
+
+@jinja2.contextfilter
+def fl_syntax_with_base(ctx, node):
+    """format_syntax followed by resolved base type if the type is a textual convention
+    example:
+        SampleShortName : OctetString (0 .. 8)
+    """
+    syntax = fl_format_syntax(node)
+    base = fl_format_base_type(fl_resolve_syntax(ctx, node))
+    return u"{} : {}".format(syntax, base) if base else syntax
+
+@memoized_filter
 def fl_parse_typedef(typetag):
     '''Parse "typedef" node
     input:
@@ -157,6 +326,10 @@ _access_cnv_table = [
         }
 ]
 
+def is_known_access(access):
+    """check if access attribute in libsmi can be converted by _convert_access"""
+    return access in _access_cnv_table[0]
+
 def _convert_access(access, t=0):
     """Convert access attribute in libsmi to stnadard SMIv2 style
 
@@ -168,10 +341,12 @@ def _convert_access(access, t=0):
     return _access_cnv_table[t][access]
 
 
+@memoized_filter
 def fl_parse_scalar(node,rowcreate=False):
     """parse for scalar
     input:
         node: (Element)
+        rowcreate: True for columns of creatable rows (read-write is shown as read-create)
     return:
         list of tuple
         [ (param1, value1), (param2, value2),...]
@@ -208,7 +383,7 @@ def fl_parse_scalar(node,rowcreate=False):
 
     # add max-access
     value = node.findtext(u"access")
-    c_flag = 0 if rowcreate is None else 1
+    c_flag = 1 if rowcreate else 0
     if value is not None:
         result.append( (u"max-access", _convert_access( value, c_flag )) )
 
@@ -220,6 +395,7 @@ def fl_parse_scalar(node,rowcreate=False):
 
     return result
 
+@memoized_filter
 def fl_parse_table(node):
     """parse table #1 : description part
 
@@ -247,6 +423,7 @@ def fl_parse_table(node):
 
     return result
 
+@memoized_filter
 def fl_parse_table_toc(node):
     """parse table #2 : column list part
     input:
@@ -278,6 +455,7 @@ def fl_parse_table_toc(node):
 
     return columns
 
+@memoized_filter
 def fl_parse_row(node):
     """parse for row
 
@@ -335,6 +513,65 @@ def fl_calc_oid_indent(ctx, oid_str):
         #        depth, oid[oid_prefix_level-1:depth], ttree[ oid[oid_prefix_level-1:depth] ], val, pattern )
     return result
 
+# tree drawing by cell background (same as mibtree.js)
+_tree_unit = 10
+_tree_line = u"linear-gradient(#4573D5, #4573D5)"
+
+def tree_pattern_style(pattern):
+    """CSS declarations drawing a connector pattern (see fl_calc_oid_indent)
+
+    input:
+        pattern: string of pattern digits e.g. "1013"
+    return:
+        string
+    """
+    images, sizes, positions = [], [], []
+    for i, p in enumerate(pattern):
+        x = u"{}px".format(i * _tree_unit)
+        if p in u"02":
+            images.append(_tree_line); sizes.append(u"2px 100%"); positions.append(x + u" 0")
+        elif p == u"3":
+            images.append(_tree_line); sizes.append(u"2px 8px"); positions.append(x + u" 0")
+        if p in u"23":
+            images.append(_tree_line); sizes.append(u"{}px 2px".format(_tree_unit)); positions.append(x + u" 6px")
+
+    result = []
+    if images:
+        result.append(u"background-image:" + u",".join(images))
+        result.append(u"background-size:" + u",".join(sizes))
+        result.append(u"background-position:" + u",".join(positions))
+    result.append(u"width:{}px".format(len(pattern) * _tree_unit))
+    return u";".join(result)
+
+@jinja2.contextfilter
+def fl_tree_styles(ctx, mib_array):
+    """Style rules for the tree column of the main MIB tree table
+
+    One rule is made for each distinct pattern in the table,
+    so that the tree is drawn by CSS only.
+
+    input:
+        ctx: template context (see fl_calc_oid_indent)
+        mib_array: array built by build_mib_node_array
+    return:
+        Markup (CSS rules)
+    """
+    patterns = []
+    seen = set()
+    for oid_t, node in mib_array:
+        nodes = [ node ]
+        if node.tag == u"table":
+            nodes += node.findall(u".//*[@oid]")
+        for n in nodes:
+            pattern = u"".join( str(p) for p in fl_calc_oid_indent(ctx, n.get(u"oid")) )
+            if pattern not in seen:
+                seen.add(pattern)
+                patterns.append(pattern)
+
+    return Markup(u"\n").join(
+            Markup(u'td[data-tree="{}"] {{{}}}').format(pattern, tree_pattern_style(pattern))
+            for pattern in patterns )
+
 @jinja2.contextfilter
 def fl_short_oid(ctx, oid_str):
     """Shorten oid string
@@ -369,6 +606,7 @@ def create_oid_suffix_str(num):
     return basestr[:num * 2]
 
        
+@memoized_filter
 def fl_linkage_suffix(row):
     """create oid suffix suitable for linkage
     """
@@ -391,13 +629,16 @@ def fl_hyperlink(ctx, in_str):
 
     input:
         ctx : context
-        index : hyperlnk
+        anchors : names having hyperlink target in the document
 
     return:
         Markup string
 
     """
-    lookup = ctx.parent[u"index"]
+    lookup = ctx.parent[u"anchors"]
+    if not lookup:
+        # nothing to link (e.g. detail sections are not rendered)
+        return Markup.escape(in_str)
 
     result = []
     current_pos = 0 # position of the last processed string
@@ -418,6 +659,84 @@ def fl_hyperlink(ctx, in_str):
     return Markup(u"").join( result )
 
 
+def _name_list(node, path):
+    return u", ".join( child.get(u"name") for child in node.iterfind(path) )
+
+# syntax / index column of the main MIB tree table (see _table.html)
+_virtual_name_lists = {
+        u"row": u"./linkage/*",
+        u"notification": u"./objects/object",
+        u"group": u"./members/member",
+        u"compliance": u"./requires/*",
+        }
+
+@jinja2.contextfilter
+def fl_virtual_rows(ctx, mib_array):
+    """Build JSON payload of the main MIB tree table for virtual scrolling
+
+    Rows are in the same order as _table.html draws them
+    (rows and columns follow their table).
+    Each row is [ class, name, short oid, tree pattern, access, syntax ]
+    syntax is HTML including hyperlinks. The other fields are plain text.
+
+    input:
+        ctx: template context (see fl_calc_oid_indent, fl_short_oid and fl_hyperlink)
+        mib_array: array built by build_mib_node_array
+    return:
+        Markup (JSON array which can be placed in <script> element)
+    """
+    # values for unselected columns are not computed (left empty)
+    columns = ctx.parent[u"columns"]
+    show_tree = u"tree" in columns
+    show_oid = u"oid" in columns
+    show_access = u"access" in columns
+    show_syntax = u"syntax" in columns
+    rows = []
+
+    def syntax_of(node):
+        if node.tag in (u"scalar", u"column"):
+            return fl_syntax_with_base(ctx, node)
+        elif node.tag in (u"node", u"table"):
+            return u""
+        elif node.tag in _virtual_name_lists:
+            return _name_list(node, _virtual_name_lists[node.tag])
+        return u"under construction"
+
+    def append(node, cls, suffix=u"", create=False):
+        oid = node.get(u"oid")
+        access = node.findtext(u"access") if show_access else None
+        rows.append([
+            cls,
+            node.get(u"name"),
+            (fl_short_oid(ctx, oid) or u"") + suffix if show_oid else u"",
+            u"".join( str(p) for p in fl_calc_oid_indent(ctx, oid) ) if show_tree else u"",
+            _access_cnv_table[1 if create else 0].get(access, u"") if access else u"",
+            unicode(fl_hyperlink(ctx, syntax_of(node))) if show_syntax else u"",
+            ])
+
+    for oid_t, node in mib_array:
+        append(node, node.tag)
+        if node.tag != u"table":
+            continue
+
+        row = node.find(u"row")
+        append(row, row.tag)
+        suffix = fl_linkage_suffix(row) if show_oid else u""
+        create = row.get(u"create", u"").lower() == u"true"
+        columns = row.findall(u"column")
+        for i, col in enumerate(columns):
+            cls = u"column"
+            if i == 0:
+                cls += u" column_first"
+            if i == len(columns) - 1:
+                cls += u" column_last"
+            append(col, cls, suffix=suffix, create=create)
+
+    # "</" is escaped not to close <script> element
+    payload = json.dumps(rows, ensure_ascii=False, separators=(u",", u":"))
+    return Markup(payload.replace(u"</", u"<\\/"))
+
+
 @jinja2.contextfilter
 def fl_format_description(ctx, desc_str, chain=fl_hyperlink):
     """Format description in SMIv2 MIB file for HTML output
@@ -0,0 +1,58 @@
+/*
+  Tree drawing for MIB tree column
+
+  Each cell has data-tree attribute which holds one pattern per oid level.
+    0: vertical line through the cell
+    1: no line
+    2: vertical line through the cell (with horizontal line)
+    3: vertical line to the cell (with horizontal line)
+  Lines are drawn as layered backgrounds of the cell.
+  Used for rows created by mibvirtual.js. Static tables are drawn by
+  style rules generated with tree_styles filter in the same way.
+
+  Note: keep this file free from line comments and missing semicolons
+  because minified output does not preserve line breaks.
+*/
+var mibTree = (function () {
+    var unit = 10;
+    var line = "linear-gradient(#4573D5, #4573D5)";
+    var styles = {};
+
+    function style(pattern) {
+        var s = styles[pattern];
+        if (s) {
+            return s;
+        }
+        var images = [], sizes = [], positions = [];
+        for (var i = 0; i < pattern.length; i++) {
+            var p = pattern.charAt(i);
+            var x = (i * unit) + "px";
+            if (p === "0" || p === "2") {
+                images.push(line); sizes.push("2px 100%"); positions.push(x + " 0");
+            } else if (p === "3") {
+                images.push(line); sizes.push("2px 8px"); positions.push(x + " 0");
+            }
+            if (p === "2" || p === "3") {
+                images.push(line); sizes.push(unit + "px 2px"); positions.push(x + " 6px");
+            }
+        }
+        s = {
+            image: images.join(","),
+            size: sizes.join(","),
+            position: positions.join(","),
+            width: (pattern.length * unit) + "px"
+        };
+        styles[pattern] = s;
+        return s;
+    }
+
+    function draw(cell, pattern) {
+        var s = style(pattern);
+        cell.style.backgroundImage = s.image;
+        cell.style.backgroundSize = s.size;
+        cell.style.backgroundPosition = s.position;
+        cell.style.width = s.width;
+    }
+
+    return { draw: draw };
+})();
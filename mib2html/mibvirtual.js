@@ -0,0 +1,150 @@
+/*
+  Virtual scrolling of the main MIB tree table
+
+  Rows are read from the JSON payload in #nodes_data:
+    [ class, name, short oid, tree pattern, access, syntax(HTML) ]
+  Every row has the same height, so that the rows to show are
+  computed from the scroll position, and only they are in the document.
+
+  Links to #l_<name> scroll to the row when the document has no such anchor
+  (e.g. detail sections are not rendered).
+
+  Note: keep this file free from line comments and missing semicolons
+  because minified output does not preserve line breaks.
+*/
+var mibVirtual = (function () {
+    var rowHeight = 20;
+    var overscan = 10;
+    var nodetype = { "node": "", "scalar": "Type", "table": "", "row": "Index", "column": "Type", "notification": "v2Trap", "group": "Grp", "compliance": "Comp." };
+    var headers = { "tree": "", "name": "Name", "oid": "oid", "access": "access", "syntax": "syntax / index" };
+
+    function cell(tr, text, cls) {
+        var td = document.createElement("td");
+        if (cls) {
+            td.className = cls;
+        }
+        td.appendChild(document.createTextNode(text));
+        tr.appendChild(td);
+        return td;
+    }
+
+    function link(tr, name) {
+        var td = document.createElement("td");
+        var a = document.createElement("a");
+        a.href = "#l_" + name;
+        a.appendChild(document.createTextNode(name));
+        td.appendChild(a);
+        tr.appendChild(td);
+    }
+
+    function buildRow(row, columns) {
+        var tr = document.createElement("tr");
+        tr.className = row[0];
+        tr.style.height = rowHeight + "px";
+        for (var i = 0; i < columns.length; i++) {
+            var c = columns[i];
+            if (c === "tree") {
+                mibTree.draw(cell(tr, "", "mib_indent"), row[3]);
+            } else if (c === "name") {
+                link(tr, row[1]);
+            } else if (c === "oid") {
+                cell(tr, row[2]);
+            } else if (c === "access") {
+                cell(tr, row[4], "t_snt");
+            } else if (c === "syntax") {
+                cell(tr, nodetype[row[0].split(" ")[0]] || "", "t_snt");
+                cell(tr, "", "t_syn").innerHTML = row[5];
+            }
+        }
+        return tr;
+    }
+
+    function init(view, data) {
+        var rows = JSON.parse(data.textContent || data.text);
+        var columns = [];
+        var positions = {};
+        var depth = 0;
+        var i;
+
+        view.getAttribute("data-columns").replace(/[^,]+/g, function (c) {
+            if (headers.hasOwnProperty(c)) {
+                columns.push(c);
+            }
+        });
+        for (i = 0; i < rows.length; i++) {
+            positions[rows[i][1]] = i;
+            depth = Math.max(depth, rows[i][3].length);
+        }
+
+        var spacer = document.createElement("div");
+        var table = document.createElement("table");
+        var thead = document.createElement("thead");
+        var tbody = document.createElement("tbody");
+        table.className = "main";
+        for (i = 0; i < columns.length; i++) {
+            var th = document.createElement("th");
+            th.appendChild(document.createTextNode(headers[columns[i]]));
+            if (columns[i] === "tree") {
+                th.style.width = (depth * 10 + 10) + "px";
+            } else if (columns[i] === "syntax") {
+                th.colSpan = 2;
+            }
+            thead.appendChild(th);
+        }
+        table.appendChild(thead);
+        table.appendChild(tbody);
+        view.appendChild(spacer);
+        view.appendChild(table);
+
+        var first = -1, last = -1, pending = false;
+
+        function update() {
+            pending = false;
+            var top = Math.floor(view.scrollTop / rowHeight);
+            var from = Math.max(0, top - overscan);
+            var to = Math.min(rows.length, top + Math.ceil(view.clientHeight / rowHeight) + overscan);
+            if (from === first && to === last) {
+                return;
+            }
+            first = from;
+            last = to;
+
+            var body = document.createElement("tbody");
+            for (var i = from; i < to; i++) {
+                body.appendChild(buildRow(rows[i], columns));
+            }
+            table.replaceChild(body, tbody);
+            tbody = body;
+            table.style.top = (from * rowHeight) + "px";
+        }
+
+        function schedule() {
+            if (!pending) {
+                pending = true;
+                (window.requestAnimationFrame || setTimeout)(update);
+            }
+        }
+
+        function reveal() {
+            var target = decodeURIComponent(location.hash.slice(1));
+            if (target.indexOf("l_") !== 0 || document.getElementsByName(target).length > 0) {
+                return;
+            }
+            var pos = positions[target.slice(2)];
+            if (pos !== undefined) {
+                view.scrollIntoView();
+                view.scrollTop = pos * rowHeight;
+                update();
+            }
+        }
+
+        spacer.style.height = (rows.length * rowHeight + thead.offsetHeight) + "px";
+        view.addEventListener("scroll", schedule);
+        window.addEventListener("resize", schedule);
+        window.addEventListener("hashchange", reveal);
+        update();
+        reveal();
+    }
+
+    return { init: init, rowHeight: rowHeight };
+})();
@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Output writers for generated pages
+"""
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013, Gentaro Muramatsu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import re
+import sys
+import gzip
+import os
+
+# whitespace handling for minified output
+
+_re_space = re.compile(r"\s+")
+_re_space_between_tags = re.compile(r">\s*\n\s*<")
+
+def _minify_text(text):
+    """collapse whitespace in a piece of HTML"""
+    text = _re_space_between_tags.sub(u"><", text)
+    return _re_space.sub(u" ", text)
+
+def minify_html(chunks):
+    """Minify HTML given as a sequence of strings
+
+    - whitespace between tags is removed if it contains a line break
+    - other whitespace runs are collapsed into a single space
+
+    Chunks are processed one by one so that the page is never held in memory.
+    Note that line breaks are not preserved anywhere.
+    (<pre>, <textarea> or scripts relying on line breaks shall not be used)
+
+    input:
+        chunks: iterable of unicode string (e.g. Template.generate())
+    return:
+        generator of unicode string
+    """
+    pending = u""
+    for chunk in chunks:
+        # join as plain unicode: chunks can be Markup, which escapes on '+'
+        text = u"".join((pending, chunk))
+        body_len = len(text.rstrip())
+        if body_len == 0:
+            pending = text
+            continue
+
+        # keep the last character and trailing whitespace for the next chunk
+        # so that whitespace across chunks is handled as one run
+        pending = text[body_len - 1:]
+        yield _minify_text(text[:body_len - 1])
+
+    if pending:
+        yield _minify_text(pending).rstrip() + u"\n"
+
+class _CountingWriter(object):
+    """file wrapper counting bytes written"""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        self.fp.write(data)
+
+    def flush(self):
+        self.fp.flush()
+
+def write_page(chunks, out=None, compress=False, encoding="utf-8"):
+    """Write a page and an optional precompressed copy
+
+    input:
+        chunks: iterable of unicode string
+        out: output file name or file object (opened in binary mode).
+             standard output is used for None.
+        compress: write gzip copy as <out>.gz in addition (boolean)
+                  (file name of the file object is used for file object)
+        encoding: output encoding
+    return:
+        (size, compressed_size) : (integer, integer or None)
+        size in bytes of written output
+    exceptions:
+        IOError
+        ValueError : compress is requested without file name
+        exceptions raised by chunks are passed through.
+        output files are not created or replaced in this case.
+    """
+    if out is None:
+        out = sys.stdout
+    opened = not hasattr(out, "write")
+    filename = out if opened else getattr(out, "name", None)
+
+    if compress and (filename is None or filename.startswith("<")):
+        raise ValueError("compressed copy requires an output file name")
+
+    # files are written to temporary names, and renamed after the last chunk
+    # so that a failed rendering never leaves a truncated page
+    temp = u"{}.tmp".format(out) if opened else None
+    gz_temp = u"{}.gz.tmp".format(filename) if compress else None
+
+    fp = open(temp, "wb") if opened else out
+    gz_raw = None
+    gz = None
+    completed = False
+    try:
+        writer = _CountingWriter(fp)
+        if compress:
+            gz_raw = _CountingWriter(open(gz_temp, "wb"))
+            # fixed mtime keeps the compressed output reproducible
+            gz = gzip.GzipFile(os.path.basename(filename), "wb", 9, gz_raw, mtime=0)
+
+        for chunk in chunks:
+            data = chunk.encode(encoding)
+            writer.write(data)
+            if gz is not None:
+                gz.write(data)
+        writer.flush()
+        completed = True
+
+    finally:
+        if gz is not None:
+            gz.close()
+        if gz_raw is not None:
+            gz_raw.fp.close()
+        if opened:
+            fp.close()
+        if not completed:
+            for path in [ temp, gz_temp ]:
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+
+    if opened:
+        os.rename(temp, out)
+    if compress:
+        os.rename(gz_temp, filename + ".gz")
+
+    return (writer.size, gz_raw.size if gz_raw is not None else None)
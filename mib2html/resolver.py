@@ -0,0 +1,314 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Index of MIB module name to file path for import resolution
+"""
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013, Gentaro Muramatsu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import os
+import re
+import json
+import threading
+
+# module header: "MODULE-NAME DEFINITIONS ::= BEGIN"
+_re_definitions = re.compile(
+        r"^\s*([A-Za-z][A-Za-z0-9-]*)\s+DEFINITIONS\s*(?:[A-Z]+\s+TAGS\s*)?::=\s*BEGIN\b",
+        re.MULTILINE)
+_re_comment = re.compile(r"--[^\n]*")
+_re_imports = re.compile(r"\bIMPORTS\b(.*?);", re.DOTALL)
+_re_from = re.compile(r"\bFROM\s+([A-Za-z][A-Za-z0-9-]*)")
+
+INDEX_VERSION = 1
+
+_no_entry = [ 0, 0, [], [] ]
+
+def default_index_file():
+    """default location of persistent module index"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mib2html", "modules.json")
+
+def smipath_directories():
+    """directories listed in SMIPATH environment variable (libsmi convention)"""
+    return [ d for d in os.environ.get("SMIPATH", "").split(os.pathsep) if d ]
+
+def read_module_info(filename):
+    """read module names defined in a MIB file and modules imported by them
+
+    return:
+        (modules, imports): (list of string, list of string)
+        imports are listed in order of appearance
+    exceptions:
+        IOError
+    """
+    with open(filename, "rb") as f:
+        text = _re_comment.sub("", f.read())
+
+    imports = []
+    for section in _re_imports.findall(text):
+        for name in _re_from.findall(section):
+            if name not in imports:
+                imports.append(name)
+
+    return (_re_definitions.findall(text), imports)
+
+class ModuleIndex(object):
+    """Persistent index of MIB module name -> file path
+
+    MIB directories are scanned once and the result is kept in a JSON file.
+    Later scans read only files whose mtime or size changed,
+    and list only directories whose mtime changed.
+    The index is refreshed at most once per instance, on the first lookup
+    which finds a modified file, or misses while a directory was changed.
+    A lookup which misses otherwise re-reads only changed files defining
+    no module (e.g. files which failed to parse).
+
+    Limitation: a file replaced in place by another module (same name,
+    directory unchanged) is noticed only when the file of the old module
+    is looked up, or a directory is changed.
+    Modules are looked up in the order of directories (like SMIPATH).
+
+    A ModuleIndex can be shared between threads.
+
+    usage:
+        index = ModuleIndex(["/usr/share/snmp/mibs"], default_index_file())
+        index.refresh()
+        preload = index.resolve_preloads("SOME-MIB.txt")
+        index.save()
+    """
+
+    def __init__(self, directories, index_file=None):
+        """
+        input:
+            directories: MIB directories (list of string)
+            index_file: file to keep the index. None for in-memory index.
+        """
+        self.directories = [ os.path.abspath(d) for d in directories ]
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        self._dirs = {}      # directory -> [ mtime, [ file names ] ]
+        self._files = {}     # path -> [ mtime, size, [ module names ], [ imported module names ] ]
+        self._modules = None # module name -> path (built on demand)
+        self._dirty = False
+        self._fresh = False
+        self.scanned = 0     # number of files read by refresh (statistics)
+        self.load()
+
+    def load(self):
+        """read persistent index. broken or old index is ignored."""
+        if self.index_file is None or not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "rb") as f:
+                data = json.load(f)
+            if data.get(u"version") == INDEX_VERSION:
+                self._dirs = data[u"directories"]
+                self._files = data[u"files"]
+        except (IOError, ValueError, KeyError):
+            self._dirs = {}
+            self._files = {}
+
+    def save(self):
+        """write persistent index if it was changed"""
+        with self._lock:
+            if self.index_file is None or not self._dirty:
+                return
+            dirname = os.path.dirname(self.index_file)
+            if dirname and not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            # replace atomically so that concurrent runs never read partial data
+            temp = "{}.{}.tmp".format(self.index_file, os.getpid())
+            with open(temp, "wb") as f:
+                json.dump({
+                    u"version": INDEX_VERSION,
+                    u"directories": self._dirs,
+                    u"files": self._files,
+                    }, f)
+            os.rename(temp, self.index_file)
+            self._dirty = False
+
+    def refresh(self):
+        """update the index incrementally"""
+        with self._lock:
+            for directory in self.directories:
+                self._refresh_directory(directory)
+            self._modules = None
+            self._fresh = True
+
+    def _refresh_directory(self, directory):
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except OSError:
+            if self._dirs.pop(directory, None) is not None:
+                self._dirty = True
+            return
+
+        entry = self._dirs.get(directory)
+        if entry is not None and entry[0] == dir_mtime:
+            names = entry[1]
+        else:
+            names = sorted( n for n in os.listdir(directory) if not n.startswith(".") )
+            self._dirs[directory] = [ dir_mtime, names ]
+            self._dirty = True
+
+        for name in names:
+            self._refresh_file(os.path.join(directory, name))
+
+    def _refresh_file(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            if self._files.pop(path, None) is not None:
+                self._dirty = True
+            return
+
+        entry = self._files.get(path)
+        if entry is not None and entry[0] == st.st_mtime and entry[1] == st.st_size:
+            return
+
+        info = ([], [])
+        if os.path.isfile(path):
+            try:
+                info = read_module_info(path)
+            except IOError:
+                pass
+        self._files[path] = [ st.st_mtime, st.st_size, info[0], info[1] ]
+        self.scanned += 1
+        self._dirty = True
+
+    def _module_map(self):
+        if self._modules is None:
+            modules = {}
+            for directory in self.directories:
+                entry = self._dirs.get(directory)
+                if entry is None:
+                    continue
+                for name in entry[1]:
+                    path = os.path.join(directory, name)
+                    for module in self._files.get(path, _no_entry)[2]:
+                        modules.setdefault(module, path)
+            self._modules = modules
+        return self._modules
+
+    def _directories_changed(self):
+        """check if files were added to or removed from any directory"""
+        for directory in self.directories:
+            entry = self._dirs.get(directory)
+            try:
+                if entry is None or entry[0] != os.stat(directory).st_mtime:
+                    return True
+            except OSError:
+                if entry is not None:
+                    return True
+        return False
+
+    def _refresh_unparsed(self):
+        """re-read changed files which define no module
+
+        return:
+            True if any file was read
+        """
+        scanned = self.scanned
+        for directory in self.directories:
+            entry = self._dirs.get(directory)
+            if entry is None:
+                continue
+            for name in entry[1]:
+                path = os.path.join(directory, name)
+                if not self._files.get(path, _no_entry)[2]:
+                    self._refresh_file(path)
+
+        if self.scanned == scanned:
+            return False
+        self._modules = None
+        return True
+
+    def find(self, module):
+        """return path of the module or None
+
+        The index is refreshed when the file of the module was changed
+        after indexing, or the module is not known and a directory was changed.
+        Otherwise, only changed files defining no module are read again
+        for an unknown module. (see the limitation of ModuleIndex)
+        """
+        with self._lock:
+            path = self._module_map().get(module)
+            if path is not None:
+                entry = self._files[path]
+                try:
+                    st = os.stat(path)
+                    if entry[0] == st.st_mtime and entry[1] == st.st_size:
+                        return path
+                except OSError:
+                    pass
+            elif not self._directories_changed():
+                if self._refresh_unparsed():
+                    return self._module_map().get(module)
+                return None
+
+            if not self._fresh:
+                self.refresh()
+                return self._module_map().get(module)
+            return path if path is not None and os.path.exists(path) else None
+
+    def imports(self, path):
+        """return modules imported by the file. indexed information is used if available."""
+        with self._lock:
+            entry = self._files.get(path)
+        if entry is not None:
+            return entry[3]
+        return read_module_info(path)[1]
+
+    def resolve_preloads(self, filename):
+        """return MIB files imported by the file directly or indirectly
+
+        Files are ordered so that each file follows the files it imports.
+        Modules not found in the index are skipped.
+
+        input:
+            filename: MIB file
+        return:
+            list of path
+        """
+        result = []
+        visited = set([ os.path.abspath(filename) ])
+
+        def visit(path):
+            try:
+                imports = self.imports(path)
+            except IOError:
+                return
+            for module in imports:
+                found = self.find(module)
+                if found is None or found in visited:
+                    continue
+                visited.add(found)
+                visit(found)
+                result.append(found)
+
+        visit(filename)
+        return result
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Resolution of textual convention chains to base types
+"""
+
+"""
+The MIT License (MIT)
+
+Copyright (c) 2013, Gentaro Muramatsu
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+from collections import namedtuple
+
+from util import *
+
+# result of resolution
+#   chain: type names from the type itself to the last known ancestor
+#   basetype: smidump base type (e.g. OctetString, Enumeration) or None if unknown
+#   ranges: [ (min, max) ] of the nearest type in the chain which has ranges
+#   namednumbers: [ (name, number) ] of the nearest type in the chain which has them
+ResolvedType = namedtuple("ResolvedType", "chain basetype ranges namednumbers")
+
+class TypeResolver(object):
+    """Resolve chains of typedef parents to base types
+
+    Typedefs of all given modules are searched,
+    so chains into imported modules are followed when the modules are given.
+    Each named type is resolved once, and shared by all objects using it.
+
+    attributes:
+        resolved: number of named types resolved (statistics)
+    """
+
+    def __init__(self, mibs):
+        """
+        input:
+            mibs: list of ElementTree. the first one is the main module.
+        """
+        self._typedefs = {}  # (module name, type name) -> Element
+        self._by_name = {}   # type name -> Element (first definition)
+        self._memo = {}
+        self.resolved = 0
+
+        for mib in mibs:
+            module = mib.find(u"module")
+            module_name = module.get(u"name") if module is not None else u""
+            for typedef in mib.iterfind(u"typedefs/typedef"):
+                name = typedef.get(u"name")
+                self._typedefs.setdefault( (module_name, name), typedef )
+                self._by_name.setdefault( name, typedef )
+
+    def resolve(self, module, name):
+        """resolve named type
+
+        input:
+            module: module name (string, may be empty)
+            name: type name (string)
+        return:
+            ResolvedType. chain is [name] and basetype is None for unknown types.
+        """
+        key = (module, name)
+        result = self._memo.get(key)
+        if result is None:
+            # placeholder against circular definitions
+            self._memo[key] = ResolvedType([ name ], None, [], [])
+
+            typedef = self._typedefs.get(key)
+            if typedef is None:
+                typedef = self._by_name.get(name)
+            if typedef is None:
+                result = ResolvedType([ name ], None, [], [])
+            else:
+                result = self.resolve_typedef(typedef)
+            self._memo[key] = result
+            self.resolved += 1
+        return result
+
+    def resolve_typedef(self, typedef):
+        """resolve typedef Element (named or inline in syntax)
+
+        return:
+            ResolvedType. The chain starts with the name of typedef if it has a name.
+        """
+        ranges = [ (r.get(u"min"), r.get(u"max")) for r in typedef.iterfind(u"range") ]
+        namednumbers = [ (n.get(u"name"), n.get(u"number")) for n in typedef.iterfind(u"namednumber") ]
+        chain = [ typedef.get(u"name") ] if typedef.get(u"name") else []
+
+        parent = typedef.find(u"parent")
+        if parent is not None:
+            inherited = self.resolve(parent.get(u"module", u""), parent.get(u"name"))
+            chain += inherited.chain
+            ranges = ranges or inherited.ranges
+            namednumbers = namednumbers or inherited.namednumbers
+
+        return ResolvedType(chain, typedef.get(u"basetype"), ranges, namednumbers)
+
+    def resolve_syntax(self, node):
+        """resolve type of an Element having syntax
+
+        return:
+            ResolvedType or None
+            None is returned when the syntax is not derived from a typedef,
+            e.g. Integer32, Integer32 (1 .. 10) or unknown imported type
+        """
+        syntax = node.find(u"syntax/*")
+        if syntax is None:
+            return None
+
+        if syntax.tag == u"typedef":
+            result = self.resolve_typedef(syntax)
+        elif syntax.tag == u"type":
+            result = self.resolve(syntax.get(u"module", u""), syntax.get(u"name"))
+        else:
+            return None
+
+        return result if result.basetype is not None and result.chain else None
+
+def format_base_type(resolved):
+    """string expression of base type and constraints
+
+    example:
+        OctetString (0 .. 8)
+        Enumeration up(1)/ down(2)
+    """
+    result = [ resolved.basetype ]
+    if resolved.namednumbers:
+        result.append( u"/ ".join( u"{}({})".format(n, v) for n, v in resolved.namednumbers ))
+    if resolved.ranges:
+        result.append( u"(" + u", ".join( u"{} .. {}".format(lo, hi) for lo, hi in resolved.ranges ) + u")" )
+    return u" ".join(result)
@@ -9,7 +9,7 @@ import sys
 
 package_name = 'mib2html'
 
-require_libraries = [ 'jinja2 >= 2.6' ]
+require_libraries = [ 'jinja2 >= 2.7' ]
 if sys.version_info < (2, 7, 0):
     require_libraries.append( 'argparse >= 1.1' )
 
@@ -21,7 +21,7 @@ setup(name=package_name,
       license = 'MIT License',
       url ='https://github.com/gentahgr/mib2html',
       packages = [ package_name ],
-      package_data = { package_name : ['*.html', '*.css' ]},
+      package_data = { package_name : ['*.html', '*.css', '*.js' ]},
       include_package_data=True,
       # exclude_package_data = { '': 'todo.txt' },
       install_requires = require_libraries,
@@ -0,0 +1,42 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for oid annotation
+"""
+
+import os
+
+import mib2html as mh
+from mib2html.annotate import OidAnnotator
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def _annotator():
+    return OidAnnotator([ mh.read_mib_xml(xml_filename) ])
+
+def test_translate():
+    annotator = _annotator()
+
+    assert annotator.translate(u"1.3.6.1.4.1.99999.1.1.1.0") == u"sampleCount.0"
+    assert annotator.translate(u"1.3.6.1.4.1.99999.1.2.1") == u"sampleStateChange"
+    # INDEX { sampleIndex(Integer32), sampleName(OCTET STRING) }
+    assert annotator.translate(u"1.3.6.1.4.1.99999.1.1.3.1.3.5.3.97.98.99") == u'sampleState.5."abc"'
+    assert annotator.translate(u"1.3.6.1.4.1.99999.1.1.3.1.3.5.2.1.255") == u"sampleState.5.0x01ff"
+    # broken instance is kept as is
+    assert annotator.translate(u"1.3.6.1.4.1.99999.1.1.3.1.3.5.9.97") == u"sampleState.5.9.97"
+    assert annotator.translate(u"1.3.6.1.2.1.1.1.0") is None
+
+def test_annotate_lines():
+    annotator = _annotator()
+    lines = [
+        u".1.3.6.1.4.1.99999.1.1.1.0 = INTEGER: 3\n",
+        u".1.3.6.1.4.1.99999.1.1.3.1.9 = OID: .1.3.6.1.4.1.99999.1.2.1\n",
+        u".1.3.6.1.2.1.1.5.0 = STRING: 10.1.2.3\n",
+        ]
+
+    assert list(annotator.annotate(lines)) == [
+        u"sampleCount.0 = INTEGER: 3\n",
+        u"sampleEntry.9 = OID: sampleStateChange\n",
+        u".1.3.6.1.2.1.1.5.0 = STRING: 10.1.2.3\n",
+        ]
+    assert annotator.lines == 3
+    assert annotator.translated == 3
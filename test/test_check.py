@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for --check mode
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+import mib2html as mh
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def _broken_mib(tmpdir):
+    with open(xml_filename, "rb") as f:
+        content = f.read()
+    content = content.replace('<identity node="sampleMIB"/>', '<identity node="noSuchNode"/>')
+    content = content.replace('<member module="SAMPLE-MIB" name="sampleLabel"/>',
+            '<member module="SAMPLE-MIB" name="sampleLost"/>')
+    content = content.replace('<member module="SAMPLE-MIB" name="sampleIfIndex"/>',
+            '<member module="OTHER-MIB" name="otherThing"/>')
+    content = content.replace('<type module="" name="Integer32"/>', '', 1)
+    path = str(tmpdir.join("broken.xml"))
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+def test_check_mib(tmpdir):
+    assert mh.check_mib(mh.read_mib_xml(xml_filename)) == []
+
+    problems = mh.check_mib(mh.read_mib_xml(_broken_mib(tmpdir)))
+    # all problems are reported. references to other modules are not checked.
+    assert [ (check, name) for check, name, message in problems ] == [
+            (u"identity", u"noSuchNode"),
+            (u"reference", u"sampleGroup"),
+            (u"syntax", u"sampleCount") ]
+    assert u"sampleLost" in problems[1][2]
+
+def test_unknown_access(tmpdir):
+    with open(xml_filename, "rb") as f:
+        content = f.read()
+    content = content.replace("<access>readwrite</access>", "<access>install</access>", 1)
+    path = str(tmpdir.join("sppi.xml"))
+    with open(path, "wb") as f:
+        f.write(content)
+
+    assert mh.check_mib(mh.read_mib_xml(path)) == [
+            (u"access", u"sampleLabel", u"unknown access value: install") ]
+
+def test_check_main(tmpdir, monkeypatch, capsys):
+    broken = _broken_mib(tmpdir)
+    missing = str(tmpdir.join("missing.xml"))
+    monkeypatch.setattr(sys, "argv", [ "mib2html", "--check", xml_filename, "-j", "2", broken, missing ])
+    monkeypatch.delenv("SMIPATH", raising=False)
+
+    assert mh.main() == 5
+    records = [ json.loads(line) for line in capsys.readouterr()[0].splitlines() ]
+    # reported in the order of files
+    assert [ (r[u"file"], r[u"check"]) for r in records ] == [
+            (broken, u"identity"), (broken, u"reference"), (broken, u"syntax"),
+            (missing, u"open") ]
+
+    monkeypatch.setattr(sys, "argv", [ "mib2html", "--check", xml_filename ])
+    assert mh.main() == 0
+    assert capsys.readouterr()[0] == ""
+
+def test_render_accepts_one_file(monkeypatch):
+    monkeypatch.setattr(sys, "argv", [ "mib2html", xml_filename, "-o", "out.html", xml_filename ])
+    with pytest.raises(SystemExit):
+        mh.main()
+
+def test_unexpected_error_does_not_stop_batch(tmpdir, monkeypatch, capsys):
+    def fail(mib):
+        raise RuntimeError("unexpected")
+    monkeypatch.setattr(mh, "check_mib", fail)
+    monkeypatch.setattr(sys, "argv", [ "mib2html", "--check", "-j", "2", xml_filename, xml_filename ])
+    monkeypatch.delenv("SMIPATH", raising=False)
+
+    assert mh.main() == 5
+    records = [ json.loads(line) for line in capsys.readouterr()[0].splitlines() ]
+    assert [ (r[u"check"], r[u"message"]) for r in records ] == [ (u"error", u"RuntimeError: unexpected") ] * 2
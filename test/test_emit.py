@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for JSON emitters
+"""
+
+import json
+import os
+
+import mib2html as mh
+from mib2html.emit import generate_json, generate_search_index
+from mib2html.jinja_filter import filter_cache_scope
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def _context():
+    options = mh.build_argparser().parse_args([xml_filename])
+    return mh.prepare_context(mh.read_mib_xml(xml_filename), options)
+
+def test_json():
+    model = json.loads(u"".join(generate_json(_context())))
+
+    assert model[u"module"] == u"SAMPLE-MIB"
+    names = [ n[u"name"] for n in model[u"nodes"] ]
+    # rows and columns follow the table
+    assert names[names.index(u"sampleTable") + 1] == u"sampleEntry"
+    assert names[names.index(u"sampleTable") + 2] == u"sampleIndex"
+
+    nodes = dict( (n[u"name"], n) for n in model[u"nodes"] )
+    assert nodes[u"sampleEntry"][u"index"] == [u"sampleIndex", u"sampleName"]
+    assert nodes[u"sampleRowStatus"][u"max-access"] == u"read-create"
+    assert nodes[u"sampleGroup"][u"objects"][0] == u"sampleCount"
+    assert [ t[u"name"] for t in model[u"typedefs"] ][0] == u"SampleState"
+
+def test_search_index():
+    index = json.loads(u"".join(generate_search_index(_context())))
+
+    entries = index[u"entries"]
+    assert entries == sorted(entries)
+    assert [u"sampleCount", u"1.3.6.1.4.1.99999.1.1.1", u"scalar", u"l_sampleCount",
+            u"Number of entries in sampleTable."] in entries
+    # imported names have no anchor in the document
+    assert u"InterfaceIndex" not in [ e[0] for e in entries ]
+
+    # names outside the subtree are not rendered
+    options = mh.build_argparser().parse_args([xml_filename, u"--subtree", u"sampleTable"])
+    context = mh.prepare_context(mh.read_mib_xml(xml_filename), options)
+    names = [ e[0] for e in json.loads(u"".join(generate_search_index(context)))[u"entries"] ]
+    assert u"sampleState" in names
+    assert u"sampleCount" not in names
+    assert u"sampleGroup" not in names
+
+def test_filter_cache_shared_with_html():
+    renderer = mh.Renderer()
+    context = renderer.build_context(xml_filename)
+
+    with filter_cache_scope() as cache:
+        html = u"".join(renderer.generate(context, u"html"))
+        misses = cache.misses
+        model = json.loads(u"".join(generate_json(context)))
+        # every parsed element is reused from HTML rendering
+        assert cache.misses == misses
+
+    nodes = dict( (n[u"name"], n) for n in model[u"nodes"] )
+    assert nodes[u"sampleLabel"][u"max-access"] == u"read-write"
+    assert nodes[u"sampleRowStatus"][u"max-access"] == u"read-create"
+    assert u"<dt>max-access</dt><dd>read-write</dd>" in html
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for per-render memoization of filters
+"""
+
+import os
+
+import mib2html as mh
+from mib2html import jinja_filter as jf
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def _column(mib, name):
+    return mib.find(u"nodes/table/row/column[@name='{}']".format(name))
+
+def test_memoized_result_is_shared():
+    mib = mh.read_mib_xml(xml_filename)
+    column = _column(mib, u"sampleIndex")
+
+    with jf.filter_cache_scope() as cache:
+        first = jf.fl_parse_scalar(column)
+        second = jf.fl_parse_scalar(column)
+        assert first is second
+
+        # format_syntax reuses parse_typedef computed by parse_scalar
+        jf.fl_format_syntax(column)
+
+    assert cache.hits == 2
+    assert cache.stats()[u"entries"] == 0
+
+def test_arguments_are_part_of_key():
+    mib = mh.read_mib_xml(xml_filename)
+    column = _column(mib, u"sampleState")
+
+    with jf.filter_cache_scope() as cache:
+        jf.fl_parse_scalar(column)
+        jf.fl_parse_scalar(column, rowcreate=None)
+
+    assert cache.hits == 0
+    assert cache.misses == 2
+
+def test_without_scope():
+    mib = mh.read_mib_xml(xml_filename)
+    column = _column(mib, u"sampleIndex")
+
+    assert jf.active_filter_cache() is None
+    assert jf.fl_parse_scalar(column) == jf.fl_parse_scalar(column)
+    assert jf.fl_parse_scalar(column) is not jf.fl_parse_scalar(column)
+
+def test_bound_arguments_are_key():
+    mib = mh.read_mib_xml(xml_filename)
+    column = _column(mib, u"sampleState")
+
+    with jf.filter_cache_scope() as cache:
+        first = jf.fl_parse_scalar(column, True)
+        assert jf.fl_parse_scalar(column, rowcreate=True) is first
+        # default value is the same as given explicitly
+        second = jf.fl_parse_scalar(column)
+        assert jf.fl_parse_scalar(column, False) is second
+
+    assert cache.hits == 2
+    assert cache.misses == 2
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for index builders
+"""
+
+import os
+
+import pytest
+
+import mib2html as mh
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def test_reverse_index():
+    mib = mh.read_mib_xml(xml_filename)
+    used_by = mh.build_reverse_index(mib)
+
+    assert used_by[u"sampleState"] == [
+            (u"notification", u"sampleStateChange"),
+            (u"group", u"sampleGroup") ]
+    assert used_by[u"sampleGroup"] == [ (u"compliance", u"sampleCompliance") ]
+    assert u"sampleTable" not in used_by
+
+def test_find_subtree():
+    mib = mh.read_mib_xml(xml_filename)
+    mib_array = mh.build_mib_node_array(mib)
+
+    lo, hi = mh.find_subtree(mib_array, (1, 3, 6, 1, 4, 1, 99999, 1, 1))
+    names = [ node.get(u"name") for oid_t, node in mib_array[lo:hi] ]
+    assert names == [ u"sampleObjects", u"sampleCount", u"sampleLabel", u"sampleTable" ]
+
+    lo, hi = mh.find_subtree(mib_array, (1, 3, 6, 1, 4, 1, 99999, 1, 9))
+    assert lo == hi
+
+def test_subtree_context():
+    options = mh.default_options()
+    options.subtree = u"sampleConformance"
+    context = mh.prepare_context(mh.read_mib_xml(xml_filename), options)
+
+    assert [ n.get(u"name") for n in context[u"section_nodes"][u"groups"] ] == [
+            u"sampleGroup", u"sampleNotificationGroup" ]
+    assert context[u"section_nodes"][u"nodes"] == [ context[u"mib_array"][0][1] ]
+    assert context[u"section_nodes"][u"notifications"] == []
+    # tree index is built from the subtree only (keys are relative to root level)
+    assert context[u"tree_index"][(99999, 1, 3)] == 3
+    assert (99999, 1, 1) not in context[u"tree_index"]
+
+def test_subtree_of_row_and_column():
+    mib = mh.read_mib_xml(xml_filename)
+    options = mh.default_options()
+
+    # rows and columns are drawn with their table
+    for subtree in [ u"sampleEntry", u"sampleState", u"1.3.6.1.4.1.99999.1.1.3.1.2.7" ]:
+        options.subtree = subtree
+        context = mh.prepare_context(mib, options)
+        assert context[u"subtree"] == u"1.3.6.1.4.1.99999.1.1.3"
+        assert [ n.get(u"name") for oid_t, n in context[u"mib_array"] ] == [ u"sampleTable" ]
+
+def test_resolve_oid():
+    index = mh.build_index(mh.read_mib_xml(xml_filename))
+
+    assert mh.resolve_oid(u"sampleTable", index) == u"1.3.6.1.4.1.99999.1.1.3"
+    assert mh.resolve_oid(u".1.3.6", index) == u"1.3.6"
+    for bad in [ u"1..3", u"1.3.", u"noSuchNode" ]:
+        with pytest.raises(mh.InvalidMibError):
+            mh.resolve_oid(bad, index)
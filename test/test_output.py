@@ -0,0 +1,42 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for output writers
+"""
+
+import gzip
+import os
+
+import pytest
+from jinja2.utils import Markup
+
+from mib2html.output import minify_html, write_page
+
+def test_minify_across_chunks():
+    chunks = [u"<p>a  ", u"  b</p>", u"\n", u"  <p>", Markup(u"<b>c</b>"), u"</p>\n\n"]
+    assert u"".join(minify_html(chunks)) == u"<p>a b</p><p><b>c</b></p>\n"
+
+def test_write_page_with_gzip(tmpdir):
+    filename = str(tmpdir.join("out.html"))
+    size, compressed_size = write_page([u"<p>", u"テーブル", u"</p>"], filename, compress=True)
+
+    with open(filename, "rb") as f:
+        data = f.read()
+    assert size == len(data) == os.path.getsize(filename)
+    assert compressed_size == os.path.getsize(filename + ".gz")
+    assert gzip.open(filename + ".gz").read() == data
+
+def test_write_page_keeps_old_file_on_error(tmpdir):
+    filename = str(tmpdir.join("out.html"))
+    write_page([u"<p>old</p>"], filename, compress=True)
+
+    def chunks():
+        yield u"<p>new"
+        raise ValueError("rendering failed")
+
+    with pytest.raises(ValueError):
+        write_page(chunks(), filename, compress=True)
+
+    with open(filename, "rb") as f:
+        assert f.read() == "<p>old</p>"
+    assert gzip.open(filename + ".gz").read() == "<p>old</p>"
+    assert sorted(os.listdir(str(tmpdir))) == [ "out.html", "out.html.gz" ]
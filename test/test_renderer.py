@@ -0,0 +1,128 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for Renderer (library API)
+"""
+
+import io
+import json
+import os
+import re
+import threading
+
+import pytest
+
+import mib2html as mh
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def _dangling_links(html):
+    """hyperlink targets which have no anchor in the document"""
+    targets = set(re.findall(u'href="#(l_[^"]*)"', html))
+    return targets - set(re.findall(u'name="(l_[^"]*)"', html))
+
+def test_inputs():
+    renderer = mh.Renderer()
+    with open(xml_filename, "rb") as f:
+        content = f.read()
+
+    expected = renderer.render(xml_filename)
+    assert renderer.render(content) == expected
+    assert renderer.render(io.BytesIO(content)) == expected
+    assert renderer.render(mh.read_mib_xml(xml_filename)) == expected
+
+def test_write_to_file_object():
+    renderer = mh.Renderer()
+    out = io.BytesIO()
+    size = renderer.render(xml_filename, {u"rootShiftLevel": 1}, out=out)
+    assert size == len(out.getvalue())
+    assert u"OID prefix: 1.3.6.1.4.1." in out.getvalue().decode("utf-8")
+
+def test_threads():
+    renderer = mh.Renderer()
+    expected = renderer.render(xml_filename)
+    results = []
+
+    def work():
+        for i in xrange(5):
+            results.append(renderer.render(xml_filename) == expected)
+
+    threads = [ threading.Thread(target=work) for i in xrange(4) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [True] * 20
+
+def test_sections():
+    renderer = mh.Renderer()
+    html = renderer.render(xml_filename, {u"sections": (u"tree",), u"columns": (u"name", u"oid")})
+
+    assert u'<th>Name</th><th>oid</th></thead>' in html
+    assert u'name="t_Nodes"' not in html
+    assert u'name="l_sampleCount"' not in html
+    assert u'href="#l_' not in html
+    assert _dangling_links(renderer.render(xml_filename)) == set()
+    assert _dangling_links(renderer.render(xml_filename, {u"sections": (u"tree", u"groups")})) == set()
+    # members outside the subtree are not linked
+    html = renderer.render(xml_filename, {u"subtree": u"sampleTable"})
+    assert u'name="l_sampleCount"' not in html
+    assert _dangling_links(html) == set()
+
+    context = renderer.build_context(xml_filename, {u"sections": (u"tree", u"typedefs"), u"columns": (u"name",)})
+    assert context[u"used_by"] == {}
+    assert context[u"tree_index"] == {}
+    assert context[u"section_nodes"][u"nodes"] == []
+
+def test_virtual():
+    renderer = mh.Renderer()
+    html = renderer.render(xml_filename, {u"virtualTable": True})
+
+    assert u'<table id="nodes"' not in html
+    payload = re.search(u'<script type="application/json" id="nodes_data">(.*?)</script>', html).group(1)
+    rows = json.loads(payload)
+
+    # same rows as the static table
+    static = renderer.render(xml_filename)
+    tbody = static[static.index(u'<table id="nodes"'):static.index(u"</tbody>")]
+    assert len(rows) == tbody.count(u"<tr ")
+    assert [u"scalar", u"sampleCount", u"..(1).1.1", u"102", u"read-only", u"Integer32"] in rows
+    assert rows[-1][0] == u"compliance"
+    # detail anchors are still in the document
+    assert u'name="l_sampleCount"' in html
+
+    # unselected columns are left empty
+    html = renderer.render(xml_filename, {u"virtualTable": True, u"columns": (u"name", u"oid")})
+    payload = re.search(u'<script type="application/json" id="nodes_data">(.*?)</script>', html).group(1)
+    assert [u"scalar", u"sampleLabel", u"..(1).1.2", u"", u"", u""] in json.loads(payload)
+
+def test_template_options():
+    renderer = mh.Renderer()
+    minified = renderer.render(xml_filename, {u"minify": True})
+
+    assert minified == mh.Renderer(minify=True).render(xml_filename)
+    assert minified != renderer.render(xml_filename)
+    assert renderer.render(xml_filename, {u"templateException": u"strict"}) == renderer.render(xml_filename)
+
+    # output targets are given by out and fmt arguments
+    for options in [ {u"output": u"out.html"}, {u"gzip": True}, {u"emit": [ (u"json", None) ]} ]:
+        with pytest.raises(ValueError):
+            renderer.render(xml_filename, options)
+
+def test_tree_drawn_by_css():
+    html = mh.Renderer().render(xml_filename)
+
+    patterns = set(re.findall(u'<td class="mib_indent" data-tree="([0-9]*)">', html))
+    rules = re.findall(u'td\\[data-tree="([0-9]*)"\\] \\{', html)
+    assert patterns and set(rules) == patterns
+    assert len(rules) == len(patterns)
+    assert u"<script>" not in html
+
+def test_no_option_parsing_per_call(monkeypatch):
+    renderer = mh.Renderer()
+    expected = renderer.render(xml_filename, {u"fromTop": True})
+
+    def fail():
+        assert False, "command line parser is built for a call"
+    monkeypatch.setattr(mh, "build_argparser", fail)
+    assert renderer.render(xml_filename, {u"fromTop": True}) == expected
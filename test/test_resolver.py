@@ -0,0 +1,87 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for MIB module index
+"""
+
+import os
+
+from mib2html.resolver import ModuleIndex
+
+def _write(path, text):
+    with open(path, "wb") as f:
+        f.write(text)
+
+def test_resolve_preloads(tmpdir):
+    mibs = tmpdir.mkdir("mibs")
+    _write(str(mibs.join("FOO-MIB.txt")), "FOO-MIB DEFINITIONS ::= BEGIN\n"
+            "IMPORTS fooThing FROM BAR-MIB -- FROM FAKE-MIB\n"
+            "    Integer32 FROM SNMPv2-SMI;\nEND\n")
+    _write(str(mibs.join("bar")), "BAR-MIB DEFINITIONS ::= BEGIN\nEND\n")
+    main_mib = str(tmpdir.join("MAIN-MIB"))
+    _write(main_mib, "MAIN-MIB DEFINITIONS ::= BEGIN\n"
+            "IMPORTS a FROM FOO-MIB b FROM BAR-MIB;\nEND\n")
+
+    index_file = str(tmpdir.join("index.json"))
+    index = ModuleIndex([ str(mibs) ], index_file)
+    # imported modules precede the importing module
+    assert index.resolve_preloads(main_mib) == [ str(mibs.join("bar")), str(mibs.join("FOO-MIB.txt")) ]
+    assert index.scanned == 2
+    index.save()
+
+    # unchanged files are not read again
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("FOO-MIB") == str(mibs.join("FOO-MIB.txt"))
+    assert index.scanned == 0
+
+    _write(str(mibs.join("bar")), "BAR2-MIB DEFINITIONS ::= BEGIN\nEND\n")
+    os.utime(str(mibs.join("bar")), (0, 0))
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("BAR-MIB") is None
+    assert index.find("BAR2-MIB") == str(mibs.join("bar"))
+    assert index.scanned == 1
+
+def test_unknown_module_does_not_rescan(tmpdir, monkeypatch):
+    mibs = tmpdir.mkdir("mibs")
+    _write(str(mibs.join("FOO-MIB")), "FOO-MIB DEFINITIONS ::= BEGIN\nEND\n")
+    index_file = str(tmpdir.join("index.json"))
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("FOO-MIB") == str(mibs.join("FOO-MIB"))
+    index.save()
+
+    refreshed = []
+    original = ModuleIndex.refresh
+    def refresh(self):
+        refreshed.append(True)
+        original(self)
+    monkeypatch.setattr(ModuleIndex, "refresh", refresh)
+
+    # modules smidump finds by itself, or typos
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("SNMPv2-SMI") is None
+    assert refreshed == []
+
+    # new file changes the directory
+    _write(str(mibs.join("BAR-MIB")), "BAR-MIB DEFINITIONS ::= BEGIN\nEND\n")
+    os.utime(str(mibs), (0, 0))
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("BAR-MIB") == str(mibs.join("BAR-MIB"))
+    assert refreshed == [ True ]
+
+def test_fixed_file_is_read_again(tmpdir, monkeypatch):
+    mibs = tmpdir.mkdir("mibs")
+    _write(str(mibs.join("BROKEN")), "not a MIB\n")
+    os.utime(str(mibs), (1000, 1000))
+    index_file = str(tmpdir.join("index.json"))
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("FIXED-MIB") is None
+    index.save()
+
+    monkeypatch.setattr(ModuleIndex, "refresh", lambda self: None)
+    _write(str(mibs.join("BROKEN")), "FIXED-MIB DEFINITIONS ::= BEGIN\nEND\n")
+    os.utime(str(mibs.join("BROKEN")), (1, 1))
+    os.utime(str(mibs), (1000, 1000))
+
+    # the file defining no module is read again without refresh
+    index = ModuleIndex([ str(mibs) ], index_file)
+    assert index.find("FIXED-MIB") == str(mibs.join("BROKEN"))
+    assert index.scanned == 1
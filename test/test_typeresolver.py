@@ -0,0 +1,37 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""test script for textual convention resolution
+"""
+
+import os
+
+import mib2html as mh
+from mib2html.typeresolver import TypeResolver, format_base_type
+
+xml_filename = os.path.join(os.path.dirname(__file__), "sample_mib.xml")
+
+def test_resolve_chain():
+    mib = mh.read_mib_xml(xml_filename)
+    resolver = TypeResolver([ mib ])
+    index = mh.build_index(mib)
+
+    resolved = resolver.resolve_syntax(index[u"sampleName"][1])
+    assert resolved.chain == [ u"SampleShortName", u"SampleName", u"DisplayString" ]
+    assert format_base_type(resolved) == u"OctetString (0 .. 8)"
+
+    # inline typedef inherits from its parent, and keeps its own ranges
+    resolved = resolver.resolve_syntax(index[u"sampleLabel"][1])
+    assert resolved.chain == [ u"SampleName", u"DisplayString" ]
+    assert format_base_type(resolved) == u"OctetString (1 .. 16)"
+
+    resolved = resolver.resolve_syntax(index[u"sampleState"][1])
+    assert format_base_type(resolved) == u"Enumeration up(1)/ down(2)"
+
+    # base types and unknown imported types are not resolved
+    assert resolver.resolve_syntax(index[u"sampleCount"][1]) is None
+    assert resolver.resolve_syntax(index[u"sampleIfIndex"][1]) is None
+
+    # each named type is resolved once
+    count = resolver.resolved
+    resolver.resolve_syntax(index[u"sampleName"][1])
+    assert resolver.resolved == count